@@ -16,11 +16,28 @@
 
 if 'bpy' in locals():  # already reloaded
     import importlib
+    importlib.reload(locals()['preferences'])
+    importlib.reload(locals()['profiling'])
+    importlib.reload(locals()['batching'])
+    importlib.reload(locals()['chunking'])
+    importlib.reload(locals()['separation'])
+    importlib.reload(locals()['dedup'])
+    importlib.reload(locals()['transforms'])
+    importlib.reload(locals()['origin_kernels'])
+    importlib.reload(locals()['duplication'])
+    importlib.reload(locals()['instance_index'])
+    importlib.reload(locals()['instance_cache'])
+    importlib.reload(locals()['joining'])
+    importlib.reload(locals()['api'])
+    importlib.reload(locals()['manifest'])
     importlib.reload(locals()['separate_operator'])
 
 import bpy
 
-from .separate_operator import SeparateOperator, SetOriginOperator
+from .instance_cache import CheckInstanceCacheOperator, register_handlers, unregister_handlers
+from .manifest import ExportManifestOperator, ImportManifestOperator
+from .preferences import SeparateWithInstancesPreferences
+from .separate_operator import JoinOperator, SeparateOperator, SetOriginOperator
 
 bl_info = {
     'name': 'Separate with Instances',
@@ -35,12 +52,14 @@ bl_info = {
     'tracker_url': 'https://github.com/semagnum/separate_with_instances/issues',
 }
 
-classes_to_register = (SeparateOperator, SetOriginOperator,)
+classes_to_register = (SeparateWithInstancesPreferences, SeparateOperator, SetOriginOperator, JoinOperator,
+                       CheckInstanceCacheOperator, ExportManifestOperator, ImportManifestOperator,)
 
 
 def draw_menu(self, context):
     layout = self.layout
     layout.operator_menu_enum(SetOriginOperator.bl_idname, property='type')
+    layout.operator(JoinOperator.bl_idname)
 
 
 def draw_mesh_menu(self, context):
@@ -48,6 +67,14 @@ def draw_mesh_menu(self, context):
     layout.operator_menu_enum(SeparateOperator.bl_idname, property='type')
 
 
+def draw_export_menu(self, context):
+    self.layout.operator(ExportManifestOperator.bl_idname, text='Instance Manifest (.npz)')
+
+
+def draw_import_menu(self, context):
+    self.layout.operator(ImportManifestOperator.bl_idname, text='Instance Manifest (.npz)')
+
+
 def register():
     """Registers operators."""
     for cls in classes_to_register:
@@ -55,11 +82,17 @@ def register():
 
     bpy.types.VIEW3D_MT_object.append(draw_menu)
     bpy.types.VIEW3D_MT_edit_mesh.append(draw_mesh_menu)
+    bpy.types.TOPBAR_MT_file_export.append(draw_export_menu)
+    bpy.types.TOPBAR_MT_file_import.append(draw_import_menu)
+    register_handlers()
 
 
 def unregister():
+    unregister_handlers()
     bpy.types.VIEW3D_MT_object.remove(draw_menu)
     bpy.types.VIEW3D_MT_edit_mesh.remove(draw_mesh_menu)
+    bpy.types.TOPBAR_MT_file_export.remove(draw_export_menu)
+    bpy.types.TOPBAR_MT_file_import.remove(draw_import_menu)
 
     for cls in classes_to_register:
         bpy.utils.unregister_class(cls)
@@ -0,0 +1,290 @@
+"""Separate + Instances and Set Origin + Instances for scripts, working on data-blocks without operators.
+
+::
+
+    from separate_with_instances import api
+
+    pieces = api.separate_with_instances(bpy.data.meshes['Rocks'], 'LOOSE')
+    changed = api.set_origin_with_instances([mesh, other_mesh], 'ORIGIN_GEOMETRY')
+
+Each call takes one mesh or object, or many, and looks up all of their instances at once.
+Objects must be in object mode. Pass ``update=False`` to several calls
+that do not touch each other's objects, and update the view layer once afterwards.
+"""
+from itertools import groupby
+from operator import itemgetter
+
+import bpy
+import numpy as np
+from mathutils import Matrix, Vector
+
+from .dedup import deduplicate_pieces
+from .duplication import duplicate_to_instances, instance_as_collection
+from .instance_cache import lookup_instances
+from .instance_index import other_instances
+from .origin_kernels import origin_centers
+from .separation import can_separate, mesh_geometry, separate_object
+from .transforms import gather_matrices, set_world_matrices
+
+
+def resolve_scene(scene=None, view_layer=None) -> tuple:
+    """Defaults to the context scene, and to the context view layer or the scene's first one."""
+    if scene is None:
+        scene = bpy.context.scene
+    if view_layer is None:
+        view_layer = bpy.context.view_layer if scene == bpy.context.scene else scene.view_layers[0]
+    return scene, view_layer
+
+
+def find_sources(mesh_or_objects, scene, view_layer=None, scope: str = 'SCENE', collection=None,
+                 through_collection_instances: bool = False) -> tuple:
+    """Picks one object per data-block to work through, and finds the other instances of each.
+
+    :param mesh_or_objects: a data-block or object, or an iterable of them;
+        data-blocks are worked through the first object in scope using them
+    :return: the objects, and a dictionary of each to its other instances
+    :raises ValueError: for a data-block no object in scope uses
+    """
+    if isinstance(mesh_or_objects, bpy.types.ID):
+        mesh_or_objects = [mesh_or_objects]
+    items = list(mesh_or_objects)
+    data_blocks = list(dict.fromkeys(item.data if isinstance(item, bpy.types.Object) else item for item in items))
+    if view_layer is not None:
+        # the instance cache learns of objects whose data changed from depsgraph updates,
+        # which scripts may not have run since
+        view_layer.update()
+    index = lookup_instances(scene, data_blocks, through_collection_instances, scope, view_layer, collection)
+
+    data_to_source = {}
+    for item in items:
+        if isinstance(item, bpy.types.Object):
+            data_to_source.setdefault(item.data, item)
+        elif index.get(item):
+            data_to_source.setdefault(item, index[item][0])
+        else:
+            raise ValueError('No object in scope uses "{}"'.format(item.name))
+    sources = list(data_to_source.values())
+    return sources, {source: other_instances(index, source) for source in sources}
+
+
+def check_object_mode(objects):
+    """Checks that no object is in edit mode, where its mesh data is not current.
+
+    :raises ValueError: naming the first object in edit mode, or whose mesh is
+    """
+    for obj in objects:
+        if obj.mode == 'EDIT' or getattr(obj.data, 'is_editmode', False):
+            raise ValueError('"{}" is in edit mode, switch to object mode first'.format(obj.name))
+
+
+def deduplicate_separations(separations, tolerance: float, view_layer):
+    """Shares one mesh between identical pieces of each separation, see ``deduplicate_pieces``."""
+    for _, pieces in separations:
+        deduplicate_pieces(pieces, tolerance)
+    # pieces are placed relative to their initial object by their world matrices
+    view_layer.update()
+
+
+def instance_targets(separations, linked_objects: dict) -> list:
+    """Gets (initial object, instance) for every instance that gets copies of the pieces.
+
+    :param separations: (initial object, its pieces) pairs
+    :param linked_objects: dictionary of each initial object to its other instances
+    """
+    return [(source, instance) for source, pieces in separations if pieces for instance in linked_objects[source]]
+
+
+def duplicate_targets(targets, pieces_of: dict, extras=None) -> list:
+    """Copies the pieces onto instances, see ``duplicate_to_instances``.
+
+    :param targets: (initial object, instance) pairs from ``instance_targets``, or a slice of them
+    :param pieces_of: dictionary of each initial object to its pieces
+    :return: the new objects
+    """
+    new_objects = []
+    for source, group in groupby(targets, key=itemgetter(0)):
+        instances = [instance for _, instance in group]
+        new_objects.extend(duplicate_to_instances(pieces_of[source], source, instances, extras))
+    return new_objects
+
+
+def collect_separations(separations, linked_objects: dict, view_layer) -> tuple:
+    """Moves the pieces of each separation into a collection instanced in place of every instance.
+
+    See ``instance_as_collection``.
+
+    :return: the new collections, and the new collection instance objects
+    """
+    collections = []
+    collection_instances = []
+    for source, pieces in separations:
+        collection, source_instances = instance_as_collection(pieces, source, linked_objects[source], view_layer)
+        collections.append(collection)
+        collection_instances.extend(source_instances)
+    return collections, collection_instances
+
+
+def separate_with_instances(mesh_or_objects, mode: str = 'LOOSE', output: str = 'OBJECTS', extras=None,
+                            deduplicate: bool = False, dedup_tolerance: float = 1e-4, chunk_method: str = 'GRID',
+                            faces_per_chunk: int = 10000, scene=None, view_layer=None, scope: str = 'SCENE',
+                            collection=None, through_collection_instances: bool = False,
+                            update: bool = True) -> list:
+    """Separates meshes and places the pieces on every instance, like Separate + Instances.
+
+    :param mesh_or_objects: a mesh or mesh object, or an iterable of them
+    :param mode: 'SELECTED' (the mesh's stored selection), 'MATERIAL', 'LOOSE' or 'CHUNKS'
+    :param output: 'OBJECTS' or 'COLLECTION_INSTANCES'
+    :param extras: None for full copies of the pieces, or identifiers from ``EXTRAS`` for lean copies
+    :param chunk_method: identifier from ``CHUNK_METHODS``, for the CHUNKS mode
+    :param faces_per_chunk: faces to aim for in each chunk, for the CHUNKS mode
+    :param scope: identifier from ``SCOPES``, with ``view_layer`` and ``collection`` where the scope needs them
+    :param update: update the view layer before returning
+    :return: every object created: the pieces and their copies, or the pieces and the collection instances
+    :raises ValueError: for meshes no object in scope uses, in edit mode,
+        or with shape keys, vertex groups or (before Blender 4.5) custom normals,
+        which only Blender's separate operator keeps
+    """
+    scene, view_layer = resolve_scene(scene, view_layer)
+    sources, linked_objects = find_sources(mesh_or_objects, scene, view_layer, scope, collection,
+                                           through_collection_instances)
+    check_object_mode(sources)
+    for source in sources:
+        if not can_separate(source):
+            raise ValueError('"{}" has shape keys, vertex groups or custom normals'.format(source.name))
+
+    separations = [(source, separate_object(source, mode, chunk_method, faces_per_chunk)) for source in sources]
+    if deduplicate:
+        deduplicate_separations(separations, dedup_tolerance, view_layer)
+    pieces = [piece for _, source_pieces in separations for piece in source_pieces]
+
+    if output == 'COLLECTION_INSTANCES':
+        _, created = collect_separations(separations, linked_objects, view_layer)
+    else:
+        created = duplicate_targets(instance_targets(separations, linked_objects), dict(separations), extras)
+
+    if update:
+        view_layer.update()
+    return pieces + created
+
+
+def can_move_origin(obj) -> bool:
+    """Whether an object's origin can be moved directly, without ``origin_set``."""
+    return (
+        obj.type == 'MESH'
+        and obj.library is None and obj.data.library is None
+        and all(child.parent_type == 'OBJECT' for child in obj.children)
+    )
+
+
+def move_origin(obj, center) -> Matrix:
+    """Moves an object's origin to ``center``, in its data's space, keeping its geometry and children in place.
+
+    :return: offset of the object's transform
+    """
+    offset = Matrix.Translation(center)
+    obj.data.transform(Matrix.Translation(-center), shape_keys=True)
+    obj.matrix_basis = obj.matrix_basis @ offset
+    for child in obj.children:
+        child.matrix_parent_inverse = offset.inverted() @ child.matrix_parent_inverse
+    return offset
+
+
+def keep_children_in_place(objects, offsets, moved_objects=()):
+    """Keeps the children of objects whose transform moved by ``offsets`` where they were.
+
+    Pass the inverted offsets to undo it.
+
+    :param moved_objects: set or dictionary of children placed by their own new world matrices, left alone
+    """
+    for obj, offset in zip(objects, offsets):
+        inverse = Matrix(offset).inverted_safe()
+        for child in obj.children:
+            if child.parent_type == 'OBJECT' and child not in moved_objects:
+                child.matrix_parent_inverse = inverse @ child.matrix_parent_inverse
+
+
+def move_origins(objects, origin_type: str, center: str = 'MEDIAN', cursor=(0, 0, 0)) -> list:
+    """Sets the origin of each object's mesh like ``bpy.ops.object.origin_set``, without operators.
+
+    Mesh centers are computed together, spread over threads when there are many meshes.
+
+    :param origin_type: type of ``origin_set``
+    :param center: MEDIAN or BOUNDS
+    :param cursor: world location for ORIGIN_CURSOR
+    :return: offset of each object's transform, identity for GEOMETRY_ORIGIN where only the geometry moves
+    :raises ValueError: for objects whose origin cannot be moved directly, see ``can_move_origin``
+    """
+    for obj in objects:
+        if not can_move_origin(obj):
+            raise ValueError('Cannot move the origin of "{}" directly'.format(obj.name))
+
+    if origin_type == 'ORIGIN_CURSOR':
+        centers = [obj.matrix_world.inverted_safe() @ Vector(cursor) for obj in objects]
+    else:
+        # geometry to origin moves the geometry by the center origin to geometry would move to
+        kernel_type = 'ORIGIN_GEOMETRY' if origin_type == 'GEOMETRY_ORIGIN' else origin_type
+        centers = [Vector(center_co) for center_co in
+                   origin_centers(kernel_type, center, [mesh_geometry(obj.data) for obj in objects])]
+
+    offsets = []
+    for obj, center_co in zip(objects, centers):
+        if origin_type == 'GEOMETRY_ORIGIN':
+            obj.data.transform(Matrix.Translation(-center_co), shape_keys=True)
+            offsets.append(Matrix.Identity(4))
+        else:
+            offsets.append(move_origin(obj, center_co))
+    return offsets
+
+
+def instance_moves(objects, offsets, linked_objects: dict) -> tuple:
+    """Gets the instances that move with each object's origin to stay in place, and their new world matrices.
+
+    The data moved by the inverse of each offset, in the data's own space,
+    so every other instance moves by the offset too, and its children need ``keep_children_in_place``.
+
+    :return: list of instances, an (N, 4, 4) array of their world matrices, and the offset of each
+    """
+    moved_objects = []
+    moved_worlds = [np.empty((0, 4, 4))]
+    moved_offsets = []
+    for obj, offset in zip(objects, offsets):
+        instances = linked_objects[obj]
+        moved_objects.extend(instances)
+        moved_worlds.append(gather_matrices(instances) @ np.array(offset))
+        moved_offsets.extend([offset] * len(instances))
+    return moved_objects, np.concatenate(moved_worlds), moved_offsets
+
+
+def set_origin_with_instances(mesh_or_objects, type: str = 'ORIGIN_GEOMETRY', center: str = 'MEDIAN',
+                              cursor=None, scene=None, view_layer=None, scope: str = 'SCENE', collection=None,
+                              through_collection_instances: bool = False, update: bool = True) -> list:
+    """Sets the origin of meshes and moves every instance to stay in place, like Set Origin + Instances.
+
+    :param mesh_or_objects: a mesh or mesh object, or an iterable of them
+    :param type: type of ``bpy.ops.object.origin_set``
+    :param center: MEDIAN or BOUNDS
+    :param cursor: world location for ORIGIN_CURSOR, defaults to the scene's 3D cursor
+    :param scope: identifier from ``SCOPES``, with ``view_layer`` and ``collection`` where the scope needs them
+    :param update: update the view layer before returning
+    :return: every object changed: one per mesh, then the instances moved
+    :raises ValueError: for meshes no object in scope uses, in edit mode, or whose origin cannot be moved directly
+    """
+    scene, view_layer = resolve_scene(scene, view_layer)
+    sources, linked_objects = find_sources(mesh_or_objects, scene, view_layer, scope, collection,
+                                           through_collection_instances)
+    check_object_mode(sources)
+    offsets = move_origins(sources, type, center, scene.cursor.location if cursor is None else cursor)
+    # instances parented to moved objects are placed from their parents' new world matrices
+    view_layer.update()
+
+    changed = list(sources)
+    if type != 'GEOMETRY_ORIGIN':
+        # only the shared data moves for geometry to origin, so every instance keeps its transform
+        moved_objects, worlds, moved_offsets = instance_moves(sources, offsets, linked_objects)
+        set_world_matrices(moved_objects, worlds)
+        keep_children_in_place(moved_objects, moved_offsets, set(moved_objects))
+        changed.extend(moved_objects)
+
+    if update:
+        view_layer.update()
+    return changed
@@ -0,0 +1,215 @@
+"""Runs Separate + Instances or Set Origin + Instances over many .blend files, headless.
+
+Run with Blender::
+
+    blender -b --python batch.py -- origin assets/ --jobs 4 --log results.jsonl
+    blender -b --python batch.py -- separate assets/ --type MATERIAL --output-dir processed/
+
+Each file is processed by its own worker Blender process, several at a time.
+Files are saved in place, or under ``--output-dir`` with the same relative paths.
+One JSON line per file records its status, timing and object counts.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import bpy
+
+ADDON_NAME = 'separate_with_instances'
+ADDON_DIR = Path(__file__).resolve().parent
+
+RESULT_PREFIX = 'SEPARATE_WITH_INSTANCES_RESULT '
+"""Marks the worker's result line in its output."""
+
+
+def load_addon():
+    """Registers the add-on from this script's folder, unless it is already enabled."""
+    if ADDON_NAME in bpy.context.preferences.addons or ADDON_NAME in sys.modules:
+        return
+    spec = importlib.util.spec_from_file_location(ADDON_NAME, ADDON_DIR / '__init__.py',
+                                                  submodule_search_locations=[str(ADDON_DIR)])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[ADDON_NAME] = module
+    spec.loader.exec_module(module)
+    module.register()
+
+
+def collect_files(paths) -> list:
+    """Gets the .blend files given directly, or found under the given directories.
+
+    :return: pairs of (file, path relative to the folder it was found in)
+    """
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend((file, file.relative_to(path)) for file in sorted(path.rglob('*.blend')))
+        else:
+            files.append((path, Path(path.name)))
+    return files
+
+
+def editable_objects(view_layer):
+    """Objects of the view layer that operators can change."""
+    return [obj for obj in view_layer.objects if obj.library is None and obj.visible_get(view_layer=view_layer)]
+
+
+def select_only(context, objects):
+    bpy.ops.object.select_all(action='DESELECT')
+    for obj in objects:
+        obj.select_set(True)
+    context.view_layer.objects.active = objects[0]
+
+
+def set_origins(context, origin_type: str, center: str):
+    """Sets the origin of every mesh in the view layer, keeping all of its instances in place."""
+    meshes = [obj for obj in editable_objects(context.view_layer) if obj.type == 'MESH']
+    if meshes:
+        select_only(context, meshes)
+        bpy.ops.object.origin_set_with_instances(type=origin_type, center=center)
+
+
+def separate_meshes(context, separate_type: str, backend: str):
+    """Separates every mesh in the view layer once, in multi-object edit mode."""
+    sources = {}
+    for obj in editable_objects(context.view_layer):
+        if obj.type != 'MESH' or obj.data.library is not None:
+            continue
+        if separate_type == 'MATERIAL' and len(obj.data.materials) < 2:
+            continue
+        sources.setdefault(obj.data, obj)
+    if not sources:
+        return
+
+    select_only(context, list(sources.values()))
+    bpy.ops.object.editmode_toggle()
+    bpy.ops.mesh.select_all(action='SELECT')
+    bpy.ops.mesh.separate_with_instances(type=separate_type, backend=backend)
+    bpy.ops.object.mode_set(mode='OBJECT')
+
+
+def process_file(filepath, mode: str, options: dict, output_path=None) -> dict:
+    """Opens one file, runs the mode on every scene and saves it.
+
+    :param mode: ``origin`` or ``separate``
+    :param options: origin_type and center, or type and backend
+    :param output_path: where to save, defaults to the file itself
+    :return: result record
+    """
+    result = {'file': str(filepath), 'mode': mode, 'status': 'ok'}
+    start = time.perf_counter()
+    try:
+        bpy.ops.wm.open_mainfile(filepath=str(filepath), load_ui=False)
+        result['objects_before'] = len(bpy.data.objects)
+
+        for scene in bpy.data.scenes:
+            view_layer = scene.view_layers[0]
+            with bpy.context.temp_override(scene=scene, view_layer=view_layer):
+                if mode == 'origin':
+                    set_origins(bpy.context, options['origin_type'], options['center'])
+                else:
+                    separate_meshes(bpy.context, options['type'], options['backend'])
+
+        result['objects_after'] = len(bpy.data.objects)
+        if output_path is None:
+            bpy.ops.wm.save_mainfile()
+            result['output'] = str(filepath)
+        else:
+            Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+            bpy.ops.wm.save_as_mainfile(filepath=str(output_path), copy=True)
+            result['output'] = str(output_path)
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = '{}: {}'.format(type(e).__name__, e)
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def worker_command(args, filepath, output_path) -> list:
+    command = [args.blender, '-b', '--factory-startup', '--python', str(Path(__file__).resolve()), '--',
+               args.mode, str(filepath), '--worker',
+               '--type', args.type, '--backend', args.backend,
+               '--origin-type', args.origin_type, '--center', args.center]
+    if output_path is not None:
+        command += ['--output-path', str(output_path)]
+    return command
+
+
+def run_worker(args, filepath, relative_path) -> dict:
+    """Processes one file in its own Blender process.
+
+    :return: the worker's result record, or a failure record if it crashed or timed out
+    """
+    output_path = Path(args.output_dir) / relative_path if args.output_dir else None
+    start = time.perf_counter()
+    try:
+        completed = subprocess.run(worker_command(args, filepath, output_path),
+                                   capture_output=True, text=True, timeout=args.timeout)
+    except subprocess.TimeoutExpired:
+        return {'file': str(filepath), 'mode': args.mode, 'status': 'timeout',
+                'seconds': time.perf_counter() - start}
+
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    return {'file': str(filepath), 'mode': args.mode, 'status': 'crashed',
+            'returncode': completed.returncode, 'error': completed.stderr[-2000:],
+            'seconds': time.perf_counter() - start}
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else sys.argv[1:]
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('mode', choices=('origin', 'separate'))
+    parser.add_argument('paths', nargs='+', help='.blend files, or directories to search for them')
+    parser.add_argument('--output-dir', help='save results here instead of overwriting the files')
+    parser.add_argument('--log', help='append JSON lines to this file instead of printing them')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='worker processes at once')
+    parser.add_argument('--timeout', type=float, default=None, help='seconds before a worker is stopped')
+    parser.add_argument('--blender', default=bpy.app.binary_path or 'blender', help='Blender executable')
+    parser.add_argument('--type', default='MATERIAL', choices=('MATERIAL', 'LOOSE'), help='separate type')
+    parser.add_argument('--backend', default='OPERATOR', choices=('OPERATOR', 'NUMPY'), help='separate backend')
+    parser.add_argument('--origin-type', default='ORIGIN_GEOMETRY',
+                        choices=('GEOMETRY_ORIGIN', 'ORIGIN_GEOMETRY', 'ORIGIN_CURSOR',
+                                 'ORIGIN_CENTER_OF_MASS', 'ORIGIN_CENTER_OF_VOLUME'))
+    parser.add_argument('--center', default='MEDIAN', choices=('MEDIAN', 'BOUNDS'))
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--output-path', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+
+    if args.worker:
+        load_addon()
+        options = {'type': args.type, 'backend': args.backend, 'origin_type': args.origin_type, 'center': args.center}
+        result = process_file(args.paths[0], args.mode, options, args.output_path)
+        print(RESULT_PREFIX + json.dumps(result), flush=True)
+        return 0
+
+    files = collect_files(args.paths)
+    log = open(args.log, 'a') if args.log else sys.stdout
+    failures = 0
+    try:
+        # threads only wait on the worker processes
+        with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+            for result in executor.map(lambda file: run_worker(args, *file), files):
+                failures += result['status'] != 'ok'
+                log.write(json.dumps(result) + '\n')
+                log.flush()
+    finally:
+        if log is not sys.stdout:
+            log.close()
+
+    print('Processed {} files, {} failed'.format(len(files), failures), file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+import time
+
+TIMER_INTERVAL = 0.01
+"""Seconds between modal timer events."""
+
+TIME_BOX = 0.1
+"""Seconds of work per modal timer event, before handing control back to the UI."""
+
+PASS_THROUGH_EVENTS = frozenset((
+    'MOUSEMOVE', 'INBETWEEN_MOUSEMOVE', 'MIDDLEMOUSE', 'WHEELUPMOUSE', 'WHEELDOWNMOUSE', 'WHEELINMOUSE',
+    'WHEELOUTMOUSE', 'TRACKPADPAN', 'TRACKPADZOOM', 'MOUSEROTATE', 'MOUSESMARTZOOM', 'NDOF_MOTION',
+    'WINDOW_DEACTIVATE', 'TIMER', 'TIMER0', 'TIMER1', 'TIMER2', 'TIMER_JOBS', 'TIMER_AUTOSAVE', 'TIMER_REPORT',
+    'TIMERREGION',
+))
+"""Events handed on to the UI while a job runs: viewport navigation and other timers.
+
+Anything else, like edits, undo or mode changes, could remove objects the job still works on.
+"""
+
+
+class BatchJob:
+    """Work over a range of items, done in batches.
+
+    Runs to completion in one go, or in time-boxed slices from a modal operator.
+
+    :param total: number of items
+    :param process_range: called with (start, stop) for each batch of items
+    :param batch_size: items per batch
+    """
+
+    def __init__(self, total: int, process_range, batch_size: int = 64):
+        self.total = total
+        self.done = 0
+        self.process_range = process_range
+        self.batch_size = max(1, batch_size)
+
+    @property
+    def finished(self) -> bool:
+        return self.done >= self.total
+
+    def run_batch(self):
+        stop = min(self.done + self.batch_size, self.total)
+        self.process_range(self.done, stop)
+        self.done = stop
+
+    def run_for(self, seconds: float) -> bool:
+        """Runs batches until finished or ``seconds`` have passed.
+
+        :return: whether the job is finished
+        """
+        deadline = time.perf_counter() + seconds
+        while not self.finished and time.perf_counter() < deadline:
+            self.run_batch()
+        return self.finished
+
+    def run_all(self):
+        while not self.finished:
+            self.run_batch()
+
+
+class ModalBatchMixin:
+    """Runs an operator's ``job`` a few batches at a time, with progress, cancelled by Esc.
+
+    Operators set ``self.job`` before calling ``start_modal``,
+    and implement ``finish(context)`` and ``rollback(context)``.
+    """
+
+    _timer = None
+
+    def start_modal(self, context):
+        window_manager = context.window_manager
+        self._timer = window_manager.event_timer_add(TIMER_INTERVAL, window=context.window)
+        window_manager.progress_begin(0, self.job.total)
+        window_manager.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def stop_modal(self, context):
+        window_manager = context.window_manager
+        window_manager.event_timer_remove(self._timer)
+        window_manager.progress_end()
+        self._timer = None
+
+    def modal(self, context, event):
+        if event.type == 'ESC' and event.value == 'PRESS':
+            self.stop_modal(context)
+            self.rollback(context)
+            self.report({'WARNING'}, 'Cancelled, changes rolled back')
+            return {'CANCELLED'}
+
+        if event.type != 'TIMER' or event.timer != self._timer:
+            # keep the viewport navigable between batches
+            if event.type in PASS_THROUGH_EVENTS:
+                return {'PASS_THROUGH'}
+            return {'RUNNING_MODAL'}
+
+        finished = self.job.run_for(TIME_BOX)
+        context.window_manager.progress_update(self.job.done)
+        if not finished:
+            return {'RUNNING_MODAL'}
+
+        self.stop_modal(context)
+        return self.finish(context)
+
+    def run(self, context, use_modal: bool):
+        """Runs the job modally if asked and possible, otherwise to completion."""
+        if use_modal and context.window is not None and not self.job.finished:
+            return self.start_modal(context)
+
+        self.job.run_all()
+        return self.finish(context)
@@ -0,0 +1,94 @@
+import numpy as np
+
+CHUNK_METHODS = (
+    ('GRID', 'Grid', 'Split along a uniform grid of cells over the mesh bounds'),
+    ('KMEANS', 'Clusters', 'Split into compact clusters of nearby faces, with k-means'),
+)
+"""Ways to split a mesh into spatial chunks."""
+
+DISTANCE_BLOCK = 1 << 22
+"""Point-to-center distances computed at once by k-means, bounding its memory."""
+
+
+def compact_labels(labels: np.ndarray) -> np.ndarray:
+    """Renumbers labels to 0, 1, 2... in the order of their values, dropping unused ones."""
+    return np.unique(labels, return_inverse=True)[1].ravel()
+
+
+def grid_labels(points: np.ndarray, cell_count: int) -> np.ndarray:
+    """Labels points by the cell of a uniform grid over their bounds, with about ``cell_count`` cells.
+
+    Axes thinner than a cell get one cell, so nearly planar layouts are split in two dimensions only.
+    """
+    if len(points) == 0 or cell_count <= 1:
+        return np.zeros(len(points), dtype=np.int64)
+
+    low = points.min(axis=0)
+    extent = points.max(axis=0) - low
+    used = extent > extent.max() * 1e-6
+    if not used.any():
+        return np.zeros(len(points), dtype=np.int64)
+
+    while True:
+        cell_size = (np.prod(extent[used]) / cell_count) ** (1 / used.sum())
+        # a thin axis would shrink the cells on the others
+        thin = used & (extent < cell_size)
+        if not thin.any() or thin.sum() == used.sum():
+            break
+        used &= ~thin
+    sizes = np.where(used, cell_size, 1.0)
+    cells = np.where(used, np.maximum(np.ceil(extent / sizes), 1), 1).astype(np.int64)
+    indices = np.minimum(((points - low) / sizes).astype(np.int64), cells - 1)
+    return compact_labels(np.ravel_multi_index(indices.T, cells))
+
+
+def nearest_centers(points: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    """Gets the index of the closest center to every point, in blocks of points."""
+    center_norms = (centers ** 2).sum(axis=1)
+    labels = np.empty(len(points), dtype=np.int64)
+    block = max(1, DISTANCE_BLOCK // len(centers))
+    for start in range(0, len(points), block):
+        # squared distances, less each point's own squared norm
+        distances = center_norms - 2 * points[start:start + block] @ centers.T
+        labels[start:start + block] = distances.argmin(axis=1)
+    return labels
+
+
+def kmeans_labels(points: np.ndarray, cluster_count: int, iterations: int = 16, seed: int = 0) -> np.ndarray:
+    """Labels points by k-means clusters, starting from points picked with a fixed seed.
+
+    :param iterations: most updates of the cluster centers, fewer if the labels settle
+    """
+    count = min(cluster_count, len(points))
+    if count <= 1:
+        return np.zeros(len(points), dtype=np.int64)
+
+    points = np.asarray(points, dtype=np.float64)
+    centers = points[np.random.default_rng(seed).choice(len(points), count, replace=False)]
+    labels = None
+    for _ in range(iterations):
+        new_labels = nearest_centers(points, centers)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+        sizes = np.bincount(labels, minlength=count)
+        filled = sizes > 0
+        # empty clusters keep their center
+        for axis in range(points.shape[1]):
+            sums = np.bincount(labels, weights=points[:, axis], minlength=count)
+            centers[filled, axis] = sums[filled] / sizes[filled]
+    return compact_labels(labels)
+
+
+def chunk_labels(points: np.ndarray, method: str, chunk_count: int) -> np.ndarray:
+    """Labels points by spatial chunk.
+
+    :param method: identifier from ``CHUNK_METHODS``
+    :param chunk_count: number of chunks to aim for
+    """
+    if method == 'GRID':
+        return grid_labels(points, chunk_count)
+    if method == 'KMEANS':
+        return kmeans_labels(points, chunk_count)
+    raise ValueError('Unsupported chunk method: {}'.format(method))
@@ -0,0 +1,87 @@
+import bpy
+import numpy as np
+from mathutils import Matrix
+
+from .separation import MeshArrays
+
+
+def shape_key(arrays: MeshArrays, tolerance: float) -> tuple:
+    """Hashable key of a piece's shape and topology that does not change under rigid transforms.
+
+    Pieces that match are only candidates; ``rigid_transform`` confirms them.
+    Distances quantized to ``tolerance`` can land on either side of a step,
+    so rare near-matches are missed rather than wrongly merged.
+    """
+    radii = np.sort(np.linalg.norm(arrays.co - arrays.co.mean(axis=0), axis=1))
+    return (
+        len(arrays.co),
+        arrays.edge_verts.tobytes(),
+        arrays.corner_verts.tobytes(),
+        arrays.face_totals.tobytes(),
+        arrays.face_materials.tobytes(),
+        tuple(arrays.materials),
+        np.round(radii / max(tolerance, 1e-9)).astype(np.int64).tobytes(),
+    )
+
+
+def rigid_transform(source: np.ndarray, target: np.ndarray) -> tuple:
+    """Finds the rotation and translation that best moves ``source`` points onto ``target`` (Kabsch).
+
+    :return: 4x4 matrix, and the largest distance between a moved point and its target
+    """
+    source_center = source.mean(axis=0)
+    target_center = target.mean(axis=0)
+    u, _, vt = np.linalg.svd((source - source_center).T @ (target - target_center))
+    # no reflections
+    d = np.sign(np.linalg.det(vt.T @ u.T)) or 1.0
+    rotation = vt.T @ np.diag((1.0, 1.0, d)) @ u.T
+
+    matrix = np.identity(4)
+    matrix[:3, :3] = rotation
+    matrix[:3, 3] = target_center - rotation @ source_center
+    error = np.abs(source @ rotation.T + matrix[:3, 3] - target).max(initial=0.0)
+    return matrix, error
+
+
+def same_attributes(a: MeshArrays, b: MeshArrays, tolerance: float) -> bool:
+    """Whether two pieces with the same topology have the same UVs and other attributes."""
+    if len(a.attributes) != len(b.attributes):
+        return False
+    return all(
+        name_a == name_b and domain_a == domain_b and values_a.shape == values_b.shape
+        and np.allclose(values_a, values_b, atol=tolerance)
+        for (name_a, _, domain_a, _, values_a), (name_b, _, domain_b, _, values_b) in zip(a.attributes, b.attributes)
+    )
+
+
+def deduplicate_pieces(pieces, tolerance: float) -> int:
+    """Makes pieces with the same shape share one mesh data-block.
+
+    A matching piece takes the first piece's mesh, and its transform gains the rigid transform
+    between the two, so it stays in place. Its own mesh is removed.
+    Callers update the view layer before reading the new world matrices.
+
+    :param pieces: separated objects
+    :param tolerance: largest vertex distance for two pieces to match
+    :return: number of mesh data-blocks removed
+    """
+    candidates = {}
+    removed = 0
+    for piece in pieces:
+        mesh = piece.data
+        arrays = MeshArrays(mesh)
+        key = shape_key(arrays, tolerance)
+
+        for original, original_arrays in candidates.get(key, ()):
+            matrix, error = rigid_transform(original_arrays.co, arrays.co)
+            if error <= tolerance and same_attributes(original_arrays, arrays, tolerance):
+                piece.data = original.data
+                piece.matrix_basis = piece.matrix_basis @ Matrix(matrix.tolist())
+                if mesh.users == 0:
+                    bpy.data.meshes.remove(mesh)
+                    removed += 1
+                break
+        else:
+            candidates.setdefault(key, []).append((piece, arrays))
+
+    return removed
@@ -0,0 +1,197 @@
+import bpy
+import numpy as np
+from mathutils import Matrix
+
+from .transforms import IDENTITY, bases_from_worlds, gather_matrices, parent_spaces, write_bases
+
+
+def relative_matrices(pieces, source) -> np.ndarray:
+    """Gets each piece's matrix relative to the object it was separated from, as an (N, 4, 4) array."""
+    source_matrix = source.matrix_world
+    relative = np.empty((len(pieces), 4, 4))
+    for i, piece in enumerate(pieces):
+        if piece.matrix_world == source_matrix:
+            # the common case, kept exact
+            relative[i] = IDENTITY
+        else:
+            relative[i] = np.linalg.solve(np.array(source_matrix), np.array(piece.matrix_world))
+    return relative
+
+
+EXTRAS = (
+    ('MODIFIERS', 'Modifiers', 'Modifier stack'),
+    ('CONSTRAINTS', 'Constraints', 'Object constraints'),
+    ('PROPERTIES', 'Custom Properties', 'Custom properties of the object'),
+    ('ANIMATION', 'Animation', 'Action and drivers'),
+)
+"""Per-object payloads that lean copies can take over from the instance they are placed on."""
+
+
+def copy_properties(source, target):
+    """Copies every writable property of one struct to another of the same type.
+
+    Custom properties are copied too where the type has them, such as geometry nodes modifier inputs.
+    """
+    for prop in source.bl_rna.properties:
+        if prop.is_readonly or prop.identifier == 'rna_type':
+            continue
+        try:
+            setattr(target, prop.identifier, getattr(source, prop.identifier))
+        except (AttributeError, TypeError, ValueError):
+            # properties only valid in some states, such as unset targets
+            pass
+    try:
+        keys = source.keys()
+    except TypeError:
+        return
+    for key in keys:
+        target[key] = source[key]
+
+
+def lean_copy(piece):
+    """Creates a bare object sharing the piece's data, with none of its modifiers, constraints or animation.
+
+    Vertex group names are kept, since the data's weights refer to them.
+    """
+    new_obj = bpy.data.objects.new(piece.name, piece.data)
+    for group in piece.vertex_groups:
+        new_obj.vertex_groups.new(name=group.name)
+    return new_obj
+
+
+def copy_extras(instance, new_obj, extras):
+    """Copies the chosen payloads of ``instance`` onto a lean copy.
+
+    :param extras: identifiers from ``EXTRAS``
+    """
+    if 'MODIFIERS' in extras:
+        for modifier in instance.modifiers:
+            copy_properties(modifier, new_obj.modifiers.new(modifier.name, modifier.type))
+    if 'CONSTRAINTS' in extras:
+        for constraint in instance.constraints:
+            copy_properties(constraint, new_obj.constraints.new(constraint.type))
+    if 'PROPERTIES' in extras:
+        for key in instance.keys():
+            new_obj[key] = instance[key]
+    if 'ANIMATION' in extras and instance.animation_data is not None:
+        animation_data = new_obj.animation_data_create()
+        animation_data.action = instance.animation_data.action
+        if hasattr(animation_data, 'action_slot'):
+            animation_data.action_slot = instance.animation_data.action_slot
+        for driver in instance.animation_data.drivers:
+            animation_data.drivers.from_existing(src_driver=driver)
+
+
+def duplicate_to_instances(pieces, source, instances, extras=None) -> list:
+    """Creates a linked copy of every piece for every instance, without calling operators.
+
+    Each copy shares its piece's data, is linked to the instance's collections,
+    takes the instance's parent, and sits relative to the instance
+    the way the piece sits relative to ``source``.
+    Matrices are computed in one batch; callers update the view layer once afterwards.
+
+    :param pieces: objects to copy
+    :param source: object the pieces were separated from
+    :param instances: objects to place the copies on
+    :param extras: if given, make lean copies instead of full ones,
+        taking over only these payloads from each instance (identifiers from ``EXTRAS``)
+    :return: the new objects
+    """
+    if not pieces or not instances:
+        return []
+
+    worlds = gather_matrices(instances)[:, np.newaxis] @ relative_matrices(pieces, source)[np.newaxis]
+    bases = bases_from_worlds(parent_spaces(instances)[:, np.newaxis], worlds).reshape(-1, 4, 4)
+
+    new_objects = []
+    for instance in instances:
+        parent = instance.parent
+        parent_inverse = instance.matrix_parent_inverse.copy()
+        collections = instance.users_collection
+
+        for piece in pieces:
+            if extras is None:
+                new_obj = piece.copy()
+            else:
+                new_obj = lean_copy(piece)
+                copy_extras(instance, new_obj, extras)
+            for collection in collections:
+                collection.objects.link(new_obj)
+
+            new_obj.parent = parent
+            new_obj.parent_type = instance.parent_type
+            new_obj.parent_bone = instance.parent_bone
+            new_obj.parent_vertices = instance.parent_vertices
+            new_obj.matrix_parent_inverse = parent_inverse
+            new_objects.append(new_obj)
+
+    write_bases(new_objects, bases)
+    return new_objects
+
+
+def instance_as_collection(pieces, source, instances, view_layer) -> tuple:
+    """Moves pieces into a new collection and replaces every instance with an instance of that collection.
+
+    Object count grows by pieces + instances, instead of pieces * instances.
+    Children of replaced instances are moved to the collection instance in their place.
+    Must run in object mode, since ``source`` is moved into the collection too.
+
+    :param pieces: objects separated from ``source``
+    :param source: object the pieces were separated from
+    :param instances: other objects sharing the data of ``source``, removed afterwards
+    :param view_layer: view layer of the scene to link the new collection to, excluded in each of its view layers
+    :return: the new collection, and the new collection instance objects
+    """
+    pieces = [source] + list(pieces)
+    instances = [source] + list(instances)
+
+    relative = relative_matrices(pieces, source)
+    instance_bases = bases_from_worlds(parent_spaces(instances), gather_matrices(instances))
+
+    collection = bpy.data.collections.new(source.name)
+    view_layer.layer_collection.collection.children.link(collection)
+    # the pieces would show at the scene origin in any view layer that includes the collection
+    for scene_view_layer in view_layer.id_data.view_layers:
+        layer_collection = next(
+            child
+            for child in scene_view_layer.layer_collection.children
+            if child.collection == collection
+        )
+        layer_collection.exclude = True
+
+    collection_instances = []
+    for instance in instances:
+        collection_instance = bpy.data.objects.new(instance.name, None)
+        collection_instance.instance_type = 'COLLECTION'
+        collection_instance.instance_collection = collection
+        for user_collection in instance.users_collection:
+            user_collection.objects.link(collection_instance)
+
+        collection_instance.parent = instance.parent
+        collection_instance.parent_type = instance.parent_type
+        collection_instance.parent_bone = instance.parent_bone
+        collection_instance.parent_vertices = instance.parent_vertices
+        collection_instance.matrix_parent_inverse = instance.matrix_parent_inverse.copy()
+
+        # same world matrix, so children keep theirs
+        for child in instance.children:
+            if child not in pieces:
+                child.parent = collection_instance
+        collection_instances.append(collection_instance)
+
+    write_bases(collection_instances, instance_bases)
+
+    for piece, matrix in zip(pieces, relative):
+        for user_collection in piece.users_collection:
+            user_collection.objects.unlink(piece)
+        collection.objects.link(piece)
+        piece.parent = None
+        piece.matrix_parent_inverse = Matrix.Identity(4)
+        piece.matrix_basis = Matrix(matrix.tolist())
+
+    for instance, collection_instance in zip(instances[1:], collection_instances[1:]):
+        name = instance.name
+        bpy.data.objects.remove(instance)
+        collection_instance.name = name
+
+    return collection, collection_instances
@@ -0,0 +1,206 @@
+from collections import OrderedDict
+
+import bpy
+from bpy.app.handlers import persistent
+
+from .instance_index import build_instance_index, search_objects
+
+MAX_ENTRIES = 100_000
+"""Data-blocks kept in the cache, least recently used ones are evicted first."""
+
+INCREMENTAL_LIMIT = 256
+"""Data-blocks updated at once above which the cache is rebuilt on its next use, instead of updated."""
+
+
+class MeshUserCache:
+    """Data-block to the scene objects using it, kept current between operator calls.
+
+    Depsgraph updates move the objects that changed between entries.
+    Anything the updates cannot describe, such as removed objects or large changes,
+    marks the cache stale, and the next lookup rebuilds it from one scan of the scene.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.scene_uid = None
+        # data session_uid: objects using it, least recently used first
+        self.entries = OrderedDict()
+        # object session_uid: data session_uid, or None for objects without data
+        self.object_data = {}
+        # whether every data-block in the scene has an entry, so a missing one has no users
+        self.complete = False
+        # objects in the file when the cache was last checked against the scene
+        self.file_object_count = None
+
+    def rebuild(self, scene):
+        self.clear()
+        self.scene_uid = scene.session_uid
+        for obj in scene.objects:
+            self.object_data[obj.session_uid] = obj.data.session_uid if obj.data is not None else None
+        for data, objects in build_instance_index(scene.objects).items():
+            self.entries[data.session_uid] = objects
+        self.complete = True
+        self.file_object_count = len(bpy.data.objects)
+        self.evict()
+
+    def evict(self):
+        while len(self.entries) > MAX_ENTRIES:
+            self.entries.popitem(last=False)
+            self.complete = False
+
+    def add(self, obj):
+        data_uid = obj.data.session_uid if obj.data is not None else None
+        previous_uid = self.object_data.get(obj.session_uid)
+        if obj.session_uid in self.object_data and previous_uid == data_uid:
+            return
+
+        if previous_uid in self.entries:
+            self.entries[previous_uid] = [other for other in self.valid_objects(previous_uid) if other != obj]
+        self.object_data[obj.session_uid] = data_uid
+        if data_uid is None:
+            return
+        if data_uid in self.entries:
+            self.entries[data_uid].append(obj)
+        elif self.complete:
+            self.entries[data_uid] = [obj]
+            self.evict()
+
+    def valid_objects(self, data_uid) -> list:
+        """Gets an entry's objects, without the ones removed since or now using other data."""
+        objects = []
+        for obj in self.entries[data_uid]:
+            try:
+                if obj.data is not None and obj.data.session_uid == data_uid:
+                    objects.append(obj)
+            except ReferenceError:
+                pass
+        return objects
+
+    def objects_changed(self, scene) -> bool:
+        """Whether objects were added to or removed from the scene that the cache does not know of.
+
+        Counting the scene's objects walks every collection,
+        so it is only done when the number of objects in the file changed.
+        """
+        file_object_count = len(bpy.data.objects)
+        if file_object_count == self.file_object_count:
+            return False
+        self.file_object_count = file_object_count
+        return len(scene.objects) != len(self.object_data)
+
+    def sync(self, scene, depsgraph):
+        """Applies the changes from one depsgraph update."""
+        if self.scene_uid != scene.session_uid:
+            return
+
+        if depsgraph.id_type_updated('OBJECT'):
+            updates = depsgraph.updates
+            if len(updates) > INCREMENTAL_LIMIT:
+                self.clear()
+                return
+            updated = [update.id.original for update in updates if isinstance(update.id, bpy.types.Object)]
+            for obj in updated:
+                self.add(obj)
+
+        # objects unlinked from the scene stay in the file, but always update a collection
+        if depsgraph.id_type_updated('COLLECTION'):
+            self.file_object_count = None
+        # objects removed, or added without an update (in excluded collections)
+        if self.objects_changed(scene):
+            self.clear()
+
+    def instance_index(self, scene, data_blocks) -> dict:
+        """Gets the scene objects using each data-block, like ``build_instance_index``.
+
+        :param data_blocks: data-blocks to look up
+        """
+        # objects added or removed since the last update, by scripts that did not update the view layer
+        if self.scene_uid != scene.session_uid or self.objects_changed(scene):
+            self.rebuild(scene)
+
+        index = {}
+        for data in data_blocks:
+            uid = data.session_uid
+            if uid not in self.entries and not self.complete:
+                self.rebuild(scene)
+            if uid in self.entries:
+                self.entries[uid] = index[data] = self.valid_objects(uid)
+                self.entries.move_to_end(uid)
+        return index
+
+
+mesh_user_cache = MeshUserCache()
+
+
+def lookup_instances(scene, data_blocks, through_collection_instances: bool = False, scope: str = 'SCENE',
+                     view_layer=None, collection=None) -> dict:
+    """Gets the objects using each data-block, from the cache when the whole scene is searched.
+
+    :param through_collection_instances: also search instanced collections, with a full scan
+    :param scope: identifier from ``SCOPES``; other scopes than the scene are scanned,
+        at a cost that follows the size of the scope
+    """
+    if through_collection_instances or scope != 'SCENE':
+        return build_instance_index(search_objects(scene, through_collection_instances, scope, view_layer, collection))
+    return mesh_user_cache.instance_index(scene, data_blocks)
+
+
+def check_cache(scene) -> list:
+    """Compares the cache against a full scan of the scene.
+
+    :return: names of the data-blocks whose cached objects differ
+    """
+    index = build_instance_index(scene.objects)
+    cached = mesh_user_cache.instance_index(scene, index.keys())
+    return [
+        data.name
+        for data, objects in index.items()
+        if set(cached.get(data, ())) != set(objects)
+    ]
+
+
+@persistent
+def sync_cache(scene, depsgraph):
+    mesh_user_cache.sync(scene, depsgraph)
+
+
+@persistent
+def clear_cache(*args):
+    mesh_user_cache.clear()
+
+
+HANDLERS = (
+    (bpy.app.handlers.depsgraph_update_post, sync_cache),
+    (bpy.app.handlers.load_post, clear_cache),
+    (bpy.app.handlers.undo_post, clear_cache),
+    (bpy.app.handlers.redo_post, clear_cache),
+)
+
+
+def register_handlers():
+    for handlers, handler in HANDLERS:
+        handlers.append(handler)
+
+
+def unregister_handlers():
+    for handlers, handler in HANDLERS:
+        if handler in handlers:
+            handlers.remove(handler)
+    mesh_user_cache.clear()
+
+
+class CheckInstanceCacheOperator(bpy.types.Operator):
+    bl_idname = 'object.check_instance_cache'
+    bl_label = 'Check Instance Cache'
+    bl_description = 'Compares the cached instances of every data-block against a full scan of the scene'
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        mismatches = check_cache(context.scene)
+        if mismatches:
+            self.report({'WARNING'}, 'Instance cache out of date for: {}'.format(', '.join(mismatches)))
+        else:
+            self.report({'INFO'}, 'Instance cache matches the scene')
+        return {'FINISHED'}
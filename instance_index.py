@@ -0,0 +1,92 @@
+from collections import defaultdict
+
+
+def build_instance_index(objects) -> dict:
+    """Groups objects by their data-block in a single pass.
+
+    Objects without data (empties) are skipped.
+
+    :param objects: objects to index, usually ``context.scene.objects``
+    :return: dictionary of data-block to the list of objects using it
+    """
+    index = defaultdict(list)
+    for obj in objects:
+        data = obj.data
+        if data is not None:
+            index[data].append(obj)
+    return dict(index)
+
+
+def other_instances(index: dict, obj) -> list:
+    """Gets the objects in the index that share data with ``obj``, excluding ``obj`` itself."""
+    return [
+        instance
+        for instance in index.get(obj.data, ())
+        if instance != obj
+    ]
+
+
+def instanced_collection_objects(objects) -> list:
+    """Gets the objects of every collection instanced by ``objects``, that are not in ``objects`` themselves.
+
+    Nested collection instances are followed, and each collection is visited once,
+    however many times it is instanced.
+    """
+    known = set(objects)
+    visited = set()
+    pending = [obj.instance_collection for obj in known
+               if obj.instance_type == 'COLLECTION' and obj.instance_collection is not None]
+    found = []
+    while pending:
+        collection = pending.pop()
+        if collection in visited:
+            continue
+        visited.add(collection)
+        for obj in collection.all_objects:
+            if obj.instance_type == 'COLLECTION' and obj.instance_collection is not None:
+                pending.append(obj.instance_collection)
+            if obj not in known:
+                known.add(obj)
+                found.append(obj)
+    return found
+
+
+SCOPES = (
+    ('SCENE', 'Scene', 'Every object in the scene'),
+    ('VIEW_LAYER', 'View Layer', 'Objects in the collections the current view layer includes'),
+    ('COLLECTION', 'Collection', 'Objects in the chosen collection and its child collections'),
+    ('VISIBLE', 'Visible', 'Objects visible in the current view layer'),
+)
+"""Where operators look for other instances."""
+
+
+def scope_objects(scene, scope: str = 'SCENE', view_layer=None, collection=None):
+    """Gets the objects of a scope, walking only that scope.
+
+    :param scope: identifier from ``SCOPES``
+    :param view_layer: view layer of the VIEW_LAYER and VISIBLE scopes
+    :param collection: collection of the COLLECTION scope
+    """
+    if scope == 'SCENE':
+        return scene.objects
+    if scope == 'VIEW_LAYER':
+        return view_layer.objects
+    if scope == 'COLLECTION':
+        return collection.all_objects
+    if scope == 'VISIBLE':
+        return [obj for obj in view_layer.objects if obj.visible_get(view_layer=view_layer)]
+    raise ValueError('Unsupported scope: {}'.format(scope))
+
+
+def search_objects(scene, through_collection_instances: bool = False, scope: str = 'SCENE',
+                   view_layer=None, collection=None) -> list:
+    """Gets the objects to look for instances in.
+
+    :param through_collection_instances: also look inside collections instanced in the scope,
+        so that changing one object there updates every instance of its collection
+    :param scope: identifier from ``SCOPES``, see ``scope_objects``
+    """
+    objects = list(scope_objects(scene, scope, view_layer, collection))
+    if through_collection_instances:
+        objects.extend(instanced_collection_objects(objects))
+    return objects
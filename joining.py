@@ -0,0 +1,184 @@
+import bpy
+import numpy as np
+
+from .separation import ATTRIBUTE_LAYOUTS, MeshArrays, can_separate, ranges, write_attributes, write_geometry
+from .transforms import IDENTITY, gather_matrices
+
+
+def can_join(target, pieces, relative: np.ndarray) -> bool:
+    """Whether the NumPy engine keeps everything about these meshes when joining them.
+
+    Mirrored pieces would need their faces flipped, which is left to Blender's join operator.
+    """
+    return (
+        can_separate(target) and all(can_separate(piece) for piece in pieces)
+        and bool(np.all(np.linalg.det(relative[:, :3, :3]) > 0))
+    )
+
+
+def join_meshes(mesh, meshes, transforms: np.ndarray):
+    """Appends the geometry of other meshes to ``mesh``, like ``bpy.ops.object.join`` does.
+
+    Materials missing from ``mesh`` are added to it, and attributes missing from some meshes are filled with zeros.
+
+    :param mesh: mesh to join into, which keeps its own geometry first
+    :param meshes: meshes to join, which may repeat
+    :param transforms: (N, 4, 4) array of each mesh's placement in the space of ``mesh``
+    """
+    read = {}
+    for joined in [mesh] + list(meshes):
+        if joined not in read:
+            read[joined] = MeshArrays(joined)
+    all_arrays = [read[joined] for joined in [mesh] + list(meshes)]
+    transforms = np.concatenate((IDENTITY[np.newaxis], transforms))
+
+    materials = list(all_arrays[0].materials)
+    co, edge_verts, corner_verts, corner_edges, face_totals, face_materials = [], [], [], [], [], []
+    corner_orders = []
+    vert_offset = edge_offset = 0
+    for arrays, transform in zip(all_arrays, transforms):
+        corners = ranges(arrays.face_starts, arrays.face_totals)
+        corner_orders.append(corners)
+        co.append(arrays.co @ transform[:3, :3].T + transform[:3, 3])
+        edge_verts.append(arrays.edge_verts + vert_offset)
+        corner_verts.append(arrays.corner_verts[corners] + vert_offset)
+        corner_edges.append(arrays.corner_edges[corners] + edge_offset)
+        face_totals.append(arrays.face_totals)
+
+        for material in arrays.materials:
+            if material not in materials:
+                materials.append(material)
+        slot_remap = np.array([materials.index(material) for material in arrays.materials] or [0], dtype=np.int32)
+        face_materials.append(slot_remap[np.clip(arrays.face_materials, 0, len(slot_remap) - 1)])
+
+        vert_offset += len(arrays.co)
+        edge_offset += len(arrays.edge_verts)
+
+    # first of each attribute name wins, material indices are remapped separately
+    layouts = {}
+    for arrays in all_arrays:
+        for name, data_type, domain, prop, _ in arrays.attributes:
+            if name != 'material_index':
+                layouts.setdefault(name, (data_type, domain, prop))
+
+    attributes = []
+    for name, (data_type, domain, prop) in layouts.items():
+        _, components, dtype = ATTRIBUTE_LAYOUTS[data_type]
+        values = []
+        for arrays, corners in zip(all_arrays, corner_orders):
+            found = next((
+                found_values for found_name, found_type, found_domain, _, found_values in arrays.attributes
+                if found_name == name and found_type == data_type and found_domain == domain
+            ), None)
+            if found is None:
+                size = {'POINT': len(arrays.co), 'EDGE': len(arrays.edge_verts),
+                        'FACE': len(arrays.face_totals), 'CORNER': len(arrays.corner_verts)}[domain]
+                found = np.zeros((size, components) if components > 1 else size, dtype=dtype)
+            elif domain == 'CORNER':
+                found = found[corners]
+            values.append(found)
+        attributes.append((name, data_type, domain, prop, np.concatenate(values)))
+
+    mesh.clear_geometry()
+    write_geometry(mesh, np.concatenate(co).astype(np.float32), np.concatenate(edge_verts),
+                   np.concatenate(corner_verts), np.concatenate(corner_edges), np.concatenate(face_totals))
+    write_attributes(mesh, attributes, all_arrays[0].active_uv_name, all_arrays[0].render_uv_name)
+    for material in materials[len(mesh.materials):]:
+        mesh.materials.append(material)
+    mesh.polygons.foreach_set('material_index', np.concatenate(face_materials))
+    mesh.update()
+
+
+def adopt_children(removed, keeper, skipped=()):
+    """Parents the children of objects about to be removed to ``keeper``, keeping them in place.
+
+    :param skipped: children to leave alone, such as ones removed too
+    """
+    keeper_inverse = keeper.matrix_world.inverted_safe()
+    for obj in removed:
+        for child in obj.children:
+            if child in skipped or child == keeper:
+                continue
+            world = child.matrix_world.copy()
+            child.parent = keeper
+            child.parent_type = 'OBJECT'
+            child.matrix_parent_inverse = keeper_inverse @ world @ child.matrix_basis.inverted_safe()
+
+
+def remove_objects(objects):
+    """Removes objects, and any mesh left without users."""
+    meshes = {obj.data for obj in objects if obj.type == 'MESH'}
+    bpy.data.batch_remove(objects)
+    bpy.data.batch_remove([mesh for mesh in meshes if mesh.users == 0])
+
+
+def join_objects(target, pieces, relative: np.ndarray):
+    """Joins pieces into the target's mesh in object mode, without operators, and removes them.
+
+    :param relative: (N, 4, 4) matrices of the pieces relative to ``target``
+    """
+    join_meshes(target.data, [piece.data for piece in pieces], relative)
+    adopt_children(pieces, target, set(pieces))
+    remove_objects(pieces)
+
+
+def match_instance_groups(target, pieces, relative: np.ndarray, instances, index: dict, tolerance: float) -> tuple:
+    """Finds, around each other instance of the target, objects arranged like the pieces are around the target.
+
+    Each object sharing a piece's mesh is matched at most once.
+
+    :param relative: (N, 4, 4) matrices of the pieces relative to ``target``
+    :param instances: other objects sharing the data of ``target``
+    :param index: instance index covering the meshes of the pieces
+    :param tolerance: largest difference of any matrix element for an object to be in place
+    :return: (instance, its matching objects) for every instance with all pieces, and the instances missing some
+    """
+    expected = gather_matrices(instances)[:, np.newaxis] @ relative[np.newaxis]
+    excluded = {target, *pieces}
+
+    # candidates sorted by x location, so each match only checks a narrow window
+    candidates = {}
+    for data in {piece.data for piece in pieces}:
+        objects = [obj for obj in index.get(data, ()) if obj not in excluded]
+        worlds = gather_matrices(objects)
+        order = np.argsort(worlds[:, 0, 3], kind='stable')
+        candidates[data] = ([objects[i] for i in order], worlds[order], worlds[order, 0, 3])
+
+    used = set()
+    groups, unmatched = [], []
+    for instance, instance_expected in zip(instances, expected):
+        matches = []
+        for piece, piece_expected in zip(pieces, instance_expected):
+            objects, worlds, xs = candidates[piece.data]
+            x = piece_expected[0, 3]
+            start = np.searchsorted(xs, x - tolerance, side='left')
+            stop = np.searchsorted(xs, x + tolerance, side='right')
+            errors = np.abs(worlds[start:stop] - piece_expected).max(axis=(1, 2), initial=0.0)
+            match = next((
+                objects[start + i] for i in np.flatnonzero(errors <= tolerance)
+                if objects[start + i] not in used and objects[start + i] not in matches
+            ), None)
+            if match is None:
+                break
+            matches.append(match)
+
+        if len(matches) == len(pieces):
+            used.update(matches)
+            groups.append((instance, matches))
+        else:
+            unmatched.append(instance)
+    return groups, unmatched
+
+
+def remove_joined(groups) -> int:
+    """Removes the objects now part of the mesh of the instance they were matched around.
+
+    :param groups: (instance, matching objects) pairs from ``match_instance_groups``
+    :return: number of objects removed
+    """
+    removed = [obj for _, matches in groups for obj in matches]
+    removed_set = set(removed)
+    for instance, matches in groups:
+        adopt_children(matches, instance, removed_set)
+    remove_objects(removed)
+    return len(removed)
@@ -0,0 +1,204 @@
+"""Instance manifests: every object using each mesh, with its transforms and parent, in one ``.npz`` file.
+
+Objects are stored mesh by mesh, so the objects of mesh ``i`` are rows ``offsets[i]:offsets[i + 1]``
+of every per-object array:
+
+- ``meshes``: mesh names
+- ``offsets``: start row of each mesh's objects, and the total row count
+- ``names``, ``collections``: object names, and the name of each object's first collection,
+  empty for a scene's own collection
+- ``matrix_world``, ``matrix_basis``, ``matrix_parent_inverse``: (N, 4, 4) float64 arrays
+- ``parents``, ``parent_types``, ``parent_bones``: parent names, empty for none, with the parent type and bone
+
+The file is saved uncompressed, so each array loads as one read.
+"""
+import bpy
+import numpy as np
+from bpy_extras.io_utils import ExportHelper, ImportHelper
+from mathutils import Matrix
+
+from .instance_cache import lookup_instances
+from .instance_index import build_instance_index, search_objects
+from .transforms import bases_from_worlds, write_bases
+
+
+def read_object_matrices(attribute: str) -> np.ndarray:
+    """Reads one matrix attribute of every object in the file at once, in ``bpy.data.objects`` order."""
+    objects = bpy.data.objects
+    matrices = np.empty(len(objects) * 16)
+    objects.foreach_get(attribute, matrices)
+    # stored column by column
+    return matrices.reshape(-1, 4, 4).transpose(0, 2, 1)
+
+
+def object_rows() -> dict:
+    """Gets the position of every object in ``bpy.data.objects``, the row order of ``read_object_matrices``."""
+    return {obj: row for row, obj in enumerate(bpy.data.objects)}
+
+
+def gather_manifest(index: dict) -> dict:
+    """Gathers the arrays of a manifest.
+
+    :param index: dictionary of each mesh to the objects using it
+    """
+    meshes = [mesh for mesh in index if isinstance(mesh, bpy.types.Mesh) and index[mesh]]
+    objects = [obj for mesh in meshes for obj in index[mesh]]
+    rows = object_rows()
+    positions = np.array([rows[obj] for obj in objects], dtype=np.int64)
+
+    def names(items):
+        return np.array([item.name if item is not None else '' for item in items], dtype=str)
+
+    return {
+        'meshes': names(meshes),
+        'offsets': np.concatenate(([0], np.cumsum([len(index[mesh]) for mesh in meshes]))).astype(np.int64),
+        'names': names(objects),
+        'collections': np.array([
+            next((collection.name for collection in obj.users_collection if not collection.is_embedded_data), '')
+            for obj in objects
+        ], dtype=str),
+        'matrix_world': read_object_matrices('matrix_world')[positions],
+        'matrix_basis': read_object_matrices('matrix_basis')[positions],
+        'matrix_parent_inverse': read_object_matrices('matrix_parent_inverse')[positions],
+        'parents': names(obj.parent for obj in objects),
+        'parent_types': np.array([obj.parent_type for obj in objects], dtype=str),
+        'parent_bones': np.array([obj.parent_bone for obj in objects], dtype=str),
+    }
+
+
+def export_manifest(filepath, meshes=None, scene=None, view_layer=None, scope: str = 'SCENE', collection=None,
+                    through_collection_instances: bool = False) -> dict:
+    """Writes the instances of meshes to a manifest file.
+
+    :param meshes: meshes to export, defaults to every mesh used in scope
+    :param scope: identifier from ``SCOPES``, with ``view_layer`` and ``collection`` where the scope needs them
+    :return: the arrays written
+    """
+    scene = scene or bpy.context.scene
+    view_layer = view_layer or bpy.context.view_layer
+    if meshes is None:
+        index = build_instance_index(search_objects(scene, through_collection_instances, scope, view_layer,
+                                                    collection))
+    else:
+        index = lookup_instances(scene, list(meshes), through_collection_instances, scope, view_layer, collection)
+
+    arrays = gather_manifest(index)
+    with open(filepath, 'wb') as file:
+        np.savez(file, **arrays)
+    return arrays
+
+
+def import_manifest(filepath, scene=None, create_missing: bool = True) -> tuple:
+    """Places objects as a manifest describes, creating any that do not exist yet.
+
+    Objects are found by name and get the manifest's mesh, parent and world matrix,
+    with parents placed first; objects with bone or vertex parents get the manifest's basis matrix instead.
+    Objects of meshes missing from the file are skipped.
+
+    :param scene: scene to link new objects to, when their collection does not exist
+    :param create_missing: create objects the file does not have yet, otherwise skip them
+    :return: objects created, and objects updated
+    """
+    scene = scene or bpy.context.scene
+    with np.load(filepath, allow_pickle=False) as manifest:
+        arrays = {key: manifest[key] for key in manifest.files}
+
+    mesh_rows = np.repeat(np.arange(len(arrays['meshes'])), np.diff(arrays['offsets']))
+    local_objects = {obj.name: obj for obj in bpy.data.objects if obj.library is None}
+    collections = {collection.name: collection for collection in bpy.data.collections if collection.library is None}
+
+    created, updated = [], []
+    row_objects = [None] * len(arrays['names'])
+    for row, (name, mesh_name) in enumerate(zip(arrays['names'], arrays['meshes'][mesh_rows])):
+        mesh = bpy.data.meshes.get(str(mesh_name))
+        if mesh is None:
+            continue
+        obj = local_objects.get(str(name))
+        if obj is None:
+            if not create_missing:
+                continue
+            obj = local_objects[str(name)] = bpy.data.objects.new(str(name), mesh)
+            collections.get(str(arrays['collections'][row]), scene.collection).objects.link(obj)
+            created.append(obj)
+        else:
+            if obj.data != mesh:
+                obj.data = mesh
+            updated.append(obj)
+        row_objects[row] = obj
+
+    rows = [row for row, obj in enumerate(row_objects) if obj is not None]
+    for row in rows:
+        obj = row_objects[row]
+        parent = local_objects.get(str(arrays['parents'][row]))
+        if obj.parent != parent:
+            obj.parent = parent
+        if parent is not None:
+            obj.parent_type = str(arrays['parent_types'][row])
+            obj.parent_bone = str(arrays['parent_bones'][row])
+
+    # parent spaces from the parents' new world matrices where the manifest has them, in one batch
+    placed = [row_objects[row] for row in rows]
+    rows = np.array(rows, dtype=np.int64)
+    manifest_rows = {obj: row for row, obj in enumerate(row_objects) if obj is not None}
+    parent_worlds = np.array([
+        arrays['matrix_world'][manifest_rows[obj.parent]] if obj.parent in manifest_rows
+        else np.array(obj.parent.matrix_world) if obj.parent is not None
+        else np.identity(4)
+        for obj in placed
+    ]).reshape(-1, 4, 4)
+    bases = bases_from_worlds(parent_worlds @ arrays['matrix_parent_inverse'][rows], arrays['matrix_world'][rows])
+    # bone and vertex parents move with evaluated data, so their children keep their basis
+    object_parented = (arrays['parents'][rows] == '') | (arrays['parent_types'][rows] == 'OBJECT')
+    bases = np.where(object_parented[:, np.newaxis, np.newaxis], bases, arrays['matrix_basis'][rows])
+
+    # only the manifest's objects are written, since writing a basis matrix decomposes it into the transform
+    for obj, parent_inverse in zip(placed, arrays['matrix_parent_inverse'][rows]):
+        obj.matrix_parent_inverse = Matrix(parent_inverse.tolist())
+    write_bases(placed, bases)
+    return created, updated
+
+
+class ExportManifestOperator(ExportHelper, bpy.types.Operator):
+    bl_idname = 'export_scene.instance_manifest'
+    bl_label = 'Export Instance Manifest'
+    bl_description = 'Writes every object using each mesh in the scene, with its transforms and parent'
+    bl_options = {'REGISTER'}
+
+    filename_ext = '.npz'
+    filter_glob: bpy.props.StringProperty(default='*.npz', options={'HIDDEN'})
+
+    selected_only: bpy.props.BoolProperty(
+        name='Selected Meshes Only',
+        description='Only write the instances of meshes used by selected objects',
+        default=False,
+    )
+
+    def execute(self, context):
+        meshes = None
+        if self.selected_only:
+            meshes = list({obj.data for obj in context.selected_objects if obj.type == 'MESH'})
+        arrays = export_manifest(self.filepath, meshes, context.scene, context.view_layer)
+        self.report({'INFO'}, 'Exported {} objects of {} meshes'.format(len(arrays['names']), len(arrays['meshes'])))
+        return {'FINISHED'}
+
+
+class ImportManifestOperator(ImportHelper, bpy.types.Operator):
+    bl_idname = 'import_scene.instance_manifest'
+    bl_label = 'Import Instance Manifest'
+    bl_description = 'Places the objects of an instance manifest, creating any that do not exist yet'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    filename_ext = '.npz'
+    filter_glob: bpy.props.StringProperty(default='*.npz', options={'HIDDEN'})
+
+    create_missing: bpy.props.BoolProperty(
+        name='Create Missing Objects',
+        description='Create objects the file does not have yet, instead of only updating existing ones',
+        default=True,
+    )
+
+    def execute(self, context):
+        created, updated = import_manifest(self.filepath, context.scene, self.create_missing)
+        context.view_layer.update()
+        self.report({'INFO'}, 'Created {} objects, updated {}'.format(len(created), len(updated)))
+        return {'FINISHED'}
@@ -0,0 +1,142 @@
+"""Mesh center computations for setting origins, on plain NumPy arrays.
+
+Nothing here imports bpy, so the kernels can be tested without Blender
+and run on worker threads: NumPy releases the GIL while it computes.
+They follow Blender's own ``BKE_mesh_center_*`` functions.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+PARALLEL_THRESHOLD = 8
+"""Meshes needed before their centers are computed on a thread pool."""
+
+
+def median_center(co: np.ndarray) -> np.ndarray:
+    """Mean of the vertex positions."""
+    if len(co) == 0:
+        return np.zeros(3)
+    return co.mean(axis=0, dtype=np.float64)
+
+
+def bounds_center(co: np.ndarray) -> np.ndarray:
+    """Center of the axis-aligned bounding box of the vertex positions."""
+    if len(co) == 0:
+        return np.zeros(3)
+    return (co.min(axis=0).astype(np.float64) + co.max(axis=0)) / 2.0
+
+
+def fan_triangles(corner_verts: np.ndarray, face_starts: np.ndarray, face_totals: np.ndarray) -> tuple:
+    """Splits every face into a fan of triangles from its first corner.
+
+    :return: (T, 3) vertex indices, and the face of each triangle
+    """
+    tri_counts = np.maximum(face_totals - 2, 0)
+    tri_faces = np.repeat(np.arange(len(face_totals)), tri_counts)
+    # position of each triangle in its face's fan, starting at 1
+    fan_index = np.arange(len(tri_faces)) - np.repeat(np.cumsum(tri_counts) - tri_counts, tri_counts) + 1
+    starts = face_starts[tri_faces]
+    tri_verts = np.stack((
+        corner_verts[starts],
+        corner_verts[starts + fan_index],
+        corner_verts[starts + fan_index + 1],
+    ), axis=1)
+    return tri_verts, tri_faces
+
+
+def face_normals(co: np.ndarray, corner_verts: np.ndarray, face_starts: np.ndarray,
+                 face_totals: np.ndarray) -> np.ndarray:
+    """Unnormalized face normals, with Newell's method."""
+    normals = np.zeros((len(face_totals), 3))
+    if len(corner_verts) == 0:
+        return normals
+    corner_faces = np.repeat(np.arange(len(face_totals)), face_totals)
+    next_corners = np.arange(len(corner_verts)) + 1
+    # the last corner of each face wraps around to its first
+    face_ends = face_starts + face_totals - 1
+    next_corners[face_ends] = face_starts
+    positions = co[corner_verts].astype(np.float64)
+    np.add.at(normals, corner_faces, np.cross(positions, co[corner_verts[next_corners]]))
+    return normals
+
+
+def surface_center(co: np.ndarray, corner_verts: np.ndarray, face_starts: np.ndarray,
+                   face_totals: np.ndarray) -> np.ndarray:
+    """Area-weighted mean of the face centroids.
+
+    Falls back to the median for meshes without any area.
+    """
+    if len(face_totals) == 0:
+        return np.zeros(3)
+
+    tri_verts, tri_faces = fan_triangles(corner_verts, face_starts, face_totals)
+    a, b, c = (co[tri_verts[:, i]].astype(np.float64) for i in range(3))
+    crosses = np.cross(b - a, c - a)
+    # triangles folding back against their face's normal count negatively, as in concave faces
+    areas = np.linalg.norm(crosses, axis=1) / 2.0
+    normals = face_normals(co, corner_verts, face_starts, face_totals)
+    areas[np.einsum('ij,ij->i', crosses, normals[tri_faces]) < 0.0] *= -1.0
+
+    total_area = areas.sum()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        center = (areas[:, None] * (a + b + c) / 3.0).sum(axis=0) / total_area
+    if not np.all(np.isfinite(center)):
+        return median_center(co)
+    return center
+
+
+def volume_center(co: np.ndarray, corner_verts: np.ndarray, face_starts: np.ndarray,
+                  face_totals: np.ndarray) -> np.ndarray:
+    """Centroid of the volume enclosed by the faces, from signed tetrahedra.
+
+    The tetrahedra share the mean of the face corners as their apex, as in Blender:
+    that keeps the sums small, and meshes that are not closed depend on it.
+    Falls back to that mean for meshes without any volume.
+    """
+    reference = median_center(co[corner_verts])
+    tri_verts, _ = fan_triangles(corner_verts, face_starts, face_totals)
+    a, b, c = (co[tri_verts[:, i]] - reference for i in range(3))
+    # six times the signed volume of each tetrahedron
+    volumes = np.einsum('ij,ij->i', a, np.cross(b, c))
+
+    total_volume = volumes.sum()
+    if total_volume == 0.0:
+        return reference
+    center = (volumes[:, None] * (a + b + c)).sum(axis=0) / (4.0 * total_volume)
+    if not np.all(np.isfinite(center)):
+        return reference
+    return center + reference
+
+
+def origin_center(origin_type: str, center: str, co: np.ndarray, corner_verts: np.ndarray,
+                  face_starts: np.ndarray, face_totals: np.ndarray) -> np.ndarray:
+    """Computes where ``origin_set`` would put a mesh's origin, in the mesh's own space.
+
+    :param origin_type: ORIGIN_GEOMETRY, ORIGIN_CENTER_OF_MASS or ORIGIN_CENTER_OF_VOLUME
+    :param center: MEDIAN or BOUNDS, for ORIGIN_GEOMETRY
+    """
+    if origin_type == 'ORIGIN_GEOMETRY':
+        return bounds_center(co) if center == 'BOUNDS' else median_center(co)
+    if origin_type == 'ORIGIN_CENTER_OF_MASS':
+        return surface_center(co, corner_verts, face_starts, face_totals)
+    if origin_type == 'ORIGIN_CENTER_OF_VOLUME':
+        return volume_center(co, corner_verts, face_starts, face_totals)
+    raise ValueError('Unsupported origin type: {}'.format(origin_type))
+
+
+def origin_centers(origin_type: str, center: str, meshes, max_workers: int = None) -> list:
+    """Computes the origins of many meshes, on a thread pool when there are enough of them.
+
+    :param meshes: (co, corner_verts, face_starts, face_totals) arrays of each mesh
+    :param max_workers: thread count, defaults to the CPU count
+    :return: one center per mesh, in order
+    """
+    def compute(arrays):
+        return origin_center(origin_type, center, *arrays)
+
+    if len(meshes) < PARALLEL_THRESHOLD:
+        return [compute(arrays) for arrays in meshes]
+
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        return list(executor.map(compute, meshes))
@@ -0,0 +1,183 @@
+import bmesh
+import numpy as np
+
+from .separation import ATTRIBUTE_LAYOUTS, MeshArrays, split_mesh
+
+ATTRIBUTE_BYTES = {
+    data_type: components * np.dtype(dtype).itemsize
+    for data_type, (_, components, dtype) in ATTRIBUTE_LAYOUTS.items()
+}
+"""Bytes per element of each attribute type, as read into ``MeshArrays``."""
+
+TOPOLOGY_BYTES = {'POINT': 12, 'EDGE': 8, 'FACE': 8, 'CORNER': 8}
+"""Bytes per element of the positions and topology read into ``MeshArrays``, by domain."""
+
+GRID_OVERSHOOT = 8
+"""Most grid cells per chunk asked for: rounding cells up on each of three axes at most doubles them."""
+
+OBJECT_BYTES = 4096
+"""Rough memory of one object without its data, with its runtime data."""
+
+
+class Estimate:
+    """Predicted cost of running an operator.
+
+    :param pieces: new pieces separated from the edited meshes
+    :param instances: other objects using those meshes
+    :param new_objects: objects the operator creates
+    :param removed_objects: objects the operator removes
+    :param mesh_bytes: approximate memory of new mesh data
+    :param moved_objects: existing objects the operator moves
+    """
+
+    def __init__(self, pieces=0, instances=0, new_objects=0, removed_objects=0, mesh_bytes=0, moved_objects=0):
+        self.pieces = pieces
+        self.instances = instances
+        self.new_objects = new_objects
+        self.removed_objects = removed_objects
+        self.mesh_bytes = mesh_bytes
+        self.moved_objects = moved_objects
+
+    def add_separation(self, pieces: int, instance_count: int, mesh_bytes: int, output: str):
+        """Adds the cost of separating one mesh used by ``instance_count`` other objects."""
+        self.pieces += pieces
+        self.instances += instance_count
+        self.mesh_bytes += mesh_bytes
+        if output == 'COLLECTION_INSTANCES':
+            # one collection instance replaces every instance, the initial object included
+            self.new_objects += pieces + instance_count + 1
+            self.removed_objects += instance_count
+        else:
+            self.new_objects += pieces * (instance_count + 1)
+
+    @property
+    def memory_bytes(self) -> int:
+        return self.mesh_bytes + self.new_objects * OBJECT_BYTES
+
+    def exceeded_limits(self, preferences) -> list:
+        """Gets descriptions of the add-on preference limits this estimate is over; none without preferences."""
+        if preferences is None:
+            return []
+        exceeded = []
+        if preferences.max_new_objects and self.new_objects > preferences.max_new_objects:
+            exceeded.append('{} new objects, over the limit of {}'.format(self.new_objects,
+                                                                           preferences.max_new_objects))
+        max_bytes = preferences.max_new_memory * 1024 * 1024
+        if max_bytes and self.memory_bytes > max_bytes:
+            exceeded.append('{} of new data, over the limit of {} MB'.format(format_bytes(self.memory_bytes),
+                                                                             preferences.max_new_memory))
+        return exceeded
+
+    def summary(self) -> list:
+        """Lines describing the estimate, for reports and operator panels."""
+        lines = []
+        if self.pieces:
+            lines += [
+                '{} new pieces, {} other instances'.format(self.pieces, self.instances),
+                '{} new objects, {} removed'.format(self.new_objects, self.removed_objects),
+                '~{} of new data'.format(format_bytes(self.memory_bytes)),
+            ]
+        if self.moved_objects:
+            # origins change once per shared mesh, never on single-user copies
+            lines.append('{} instances moved, no mesh copies'.format(self.moved_objects))
+        return lines or ['Nothing to change']
+
+
+def format_bytes(size: float) -> str:
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return '{:.0f} {}'.format(size, unit)
+        size /= 1024
+    return '{:.1f} GB'.format(size)
+
+
+def array_bytes(arrays: MeshArrays) -> int:
+    """Memory of a mesh's geometry and attributes, as read into ``arrays``."""
+    return sum(array.nbytes for array in (
+        arrays.co, arrays.edge_verts, arrays.corner_verts, arrays.corner_edges,
+        arrays.face_starts, arrays.face_materials,
+    )) + sum(values.nbytes for *_, values in arrays.attributes)
+
+
+def has_limits(preferences) -> bool:
+    """Whether the add-on preferences set any limit for ``Estimate.exceeded_limits`` to check."""
+    return preferences is not None and bool(preferences.max_new_objects or preferences.max_new_memory)
+
+
+def element_counts(mesh) -> dict:
+    """Gets the number of elements in each domain of a mesh, from the edit-mode mesh in edit mode."""
+    if mesh.is_editmode:
+        bm = bmesh.from_edit_mesh(mesh)
+        corner_count = sum(len(face.verts) for face in bm.faces)
+        return {'POINT': len(bm.verts), 'EDGE': len(bm.edges), 'FACE': len(bm.faces), 'CORNER': corner_count}
+    return {'POINT': len(mesh.vertices), 'EDGE': len(mesh.edges), 'FACE': len(mesh.polygons),
+            'CORNER': len(mesh.loops)}
+
+
+def bound_pieces(mesh, counts: dict, separate_type: str, faces_per_chunk: int = 10000) -> tuple:
+    """Gets an upper bound of ``count_pieces`` from the mesh's element counts alone, without reading its data.
+
+    :param counts: element count of each domain, from ``element_counts``
+    :return: most new pieces, and most memory of their meshes
+    """
+    if separate_type == 'SELECTED':
+        pieces = 1
+    elif separate_type == 'MATERIAL':
+        pieces = max(len(mesh.materials), 1) - 1
+    elif separate_type == 'LOOSE':
+        pieces = counts['POINT'] - 1
+    else:
+        points = counts['FACE'] + counts['EDGE'] + counts['POINT']
+        pieces = min(points, GRID_OVERSHOOT * -(-points // max(1, faces_per_chunk))) - 1
+
+    # pieces never hold more than the whole mesh
+    mesh_bytes = sum(TOPOLOGY_BYTES[domain] * count for domain, count in counts.items()) + sum(
+        ATTRIBUTE_BYTES.get(attribute.data_type, 0) * counts.get(attribute.domain, 0)
+        for attribute in mesh.attributes
+        if not attribute.name.startswith('.') and attribute.name != 'position'
+    )
+    return max(pieces, 0), mesh_bytes
+
+
+def count_pieces(arrays: MeshArrays, parts: list) -> tuple:
+    """Counts the pieces separating a mesh creates, from the parts ``split_mesh`` splits it into.
+
+    :return: number of new pieces, and approximate memory of their meshes
+    """
+    new_parts = [part for part in parts[1:] if any(len(indices) for indices in part)]
+    corner_count = max(len(arrays.corner_verts), 1)
+    new_corners = sum(len(corners) for _, corners, _, _ in new_parts)
+    return len(new_parts), array_bytes(arrays) * new_corners // corner_count
+
+
+def bound_separation(separations, separate_type: str, output: str, faces_per_chunk: int = 10000) -> Estimate:
+    """Gets an upper bound of ``estimate_separation`` from element counts, much cheaper to compute.
+
+    Meshes in edit mode are counted from the edit-mode mesh, without loading it into the object data.
+    """
+    estimate = Estimate()
+    for mesh, instances in separations:
+        pieces, mesh_bytes = bound_pieces(mesh, element_counts(mesh), separate_type, faces_per_chunk)
+        estimate.add_separation(pieces, len(instances), mesh_bytes, output)
+    return estimate
+
+
+def estimate_separation(separations, separate_type: str, output: str, chunk_method: str = 'GRID',
+                        faces_per_chunk: int = 10000, splits=None) -> Estimate:
+    """Estimates the cost of separating meshes and copying their pieces to every instance.
+
+    In edit mode, load the edit-mode meshes into the object data first.
+
+    :param separations: (mesh, other objects using it) for each mesh to separate
+    :param output: OBJECTS or COLLECTION_INSTANCES
+    :param chunk_method: see ``split_parts``
+    :param faces_per_chunk: see ``split_parts``
+    :param splits: (arrays, parts) of each mesh from ``split_mesh``, when they are already split
+    """
+    if splits is None:
+        splits = [split_mesh(mesh, separate_type, chunk_method, faces_per_chunk) for mesh, _ in separations]
+    estimate = Estimate()
+    for (_, instances), (arrays, parts) in zip(separations, splits):
+        pieces, mesh_bytes = count_pieces(arrays, parts)
+        estimate.add_separation(pieces, len(instances), mesh_bytes, output)
+    return estimate
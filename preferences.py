@@ -0,0 +1,57 @@
+import bpy
+
+
+class SeparateWithInstancesPreferences(bpy.types.AddonPreferences):
+    bl_idname = __package__
+
+    use_profiling: bpy.props.BoolProperty(
+        name='Profile Operators',
+        description='Record the time spent in each phase of the operators and report a summary',
+        default=False,
+    )
+
+    profile_dump_path: bpy.props.StringProperty(
+        name='Profile Dump',
+        description='When profiling, also write cProfile stats to this file (readable with pstats)',
+        subtype='FILE_PATH',
+        default='',
+    )
+
+    modal_threshold: bpy.props.IntProperty(
+        name='Batch Threshold',
+        description=('When run from the UI, operators that create or move at least this many objects '
+                     'run in batches, showing progress, and can be cancelled with Esc'),
+        default=2000,
+        min=1,
+    )
+
+    max_new_objects: bpy.props.IntProperty(
+        name='New Object Limit',
+        description='Ask for confirmation before creating more objects than this, 0 for no limit',
+        default=10000,
+        min=0,
+    )
+
+    max_new_memory: bpy.props.IntProperty(
+        name='New Memory Limit (MB)',
+        description='Ask for confirmation before creating more data than this, 0 for no limit',
+        default=1024,
+        min=0,
+    )
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, 'modal_threshold')
+        layout.prop(self, 'max_new_objects')
+        layout.prop(self, 'max_new_memory')
+        layout.prop(self, 'use_profiling')
+
+        row = layout.row()
+        row.active = self.use_profiling
+        row.prop(self, 'profile_dump_path')
+
+
+def get_preferences(context):
+    """Gets the add-on preferences, or None if the add-on is not enabled."""
+    addon = context.preferences.addons.get(__package__)
+    return addon.preferences if addon is not None else None
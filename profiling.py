@@ -0,0 +1,71 @@
+import cProfile
+import time
+from contextlib import contextmanager
+
+import bpy
+
+from .preferences import get_preferences
+
+
+class PhaseProfiler:
+    """Records wall time and call count for each named phase of an operator.
+
+    Does nothing unless enabled, so operators can always wrap their phases in it.
+    """
+
+    def __init__(self, enabled: bool = False, dump_path: str = ''):
+        self.enabled = enabled
+        self.dump_path = dump_path
+        self.seconds = {}
+        self.calls = {}
+        # only enabled inside phases, so operators that cancel early never leave it running
+        self._profile = cProfile.Profile() if enabled and dump_path else None
+        self._depth = 0
+
+    @classmethod
+    def from_context(cls, context):
+        """Creates a profiler set up from the add-on preferences."""
+        preferences = get_preferences(context)
+        if preferences is None or not preferences.use_profiling:
+            return cls()
+        return cls(enabled=True, dump_path=preferences.profile_dump_path)
+
+    @contextmanager
+    def phase(self, name: str):
+        """Times the wrapped block as one call of the named phase."""
+        if not self.enabled:
+            yield
+            return
+
+        if self._profile is not None and self._depth == 0:
+            self._profile.enable()
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - start
+            self.calls[name] = self.calls.get(name, 0) + 1
+            self._depth -= 1
+            if self._profile is not None and self._depth == 0:
+                self._profile.disable()
+
+    def summary(self) -> str:
+        """Gets one line of every phase's time and call count, in the order they first ran."""
+        phases = ', '.join(
+            '{} {:.3f}s ({}x)'.format(name, seconds, self.calls[name])
+            for name, seconds in self.seconds.items()
+        )
+        return 'Total {:.3f}s: {}'.format(sum(self.seconds.values()), phases)
+
+    def finish(self, operator):
+        """Writes the stats dump and reports the summary through the operator."""
+        if not self.enabled:
+            return
+
+        if self._profile is not None:
+            dump_path = bpy.path.abspath(self.dump_path)
+            self._profile.dump_stats(dump_path)
+            operator.report({'INFO'}, 'Profile written to {}'.format(dump_path))
+
+        operator.report({'INFO'}, self.summary())
@@ -1,7 +1,77 @@
 import bpy
+import numpy as np
 
+from .api import (can_move_origin, collect_separations, deduplicate_separations, duplicate_targets, instance_moves,
+                  instance_targets, keep_children_in_place, move_origins)
+from .batching import BatchJob, ModalBatchMixin
+from .chunking import CHUNK_METHODS
+from .duplication import EXTRAS, relative_matrices
+from .instance_cache import lookup_instances
+from .instance_index import SCOPES, other_instances
+from .joining import can_join, join_objects, match_instance_groups, remove_joined
+from .planning import Estimate, bound_separation, estimate_separation, has_limits
+from .preferences import get_preferences
+from .profiling import PhaseProfiler
+from .separation import (MeshArrays, can_separate, ranges, read_array, read_layer, separate_object, spatial_groups,
+                         split_mesh)
+from .transforms import gather_matrices, set_world_matrices, write_bases
 
-class SeparateOperator(bpy.types.Operator):
+CHUNK_ATTRIBUTE = 'separate_with_instances_chunk'
+"""Temporary face attribute holding each face's chunk while chunks are separated with Blender's operator."""
+
+
+def use_modal_for(context, object_count: int) -> bool:
+    """Whether an operator touching this many objects should run in batches, with progress."""
+    preferences = get_preferences(context)
+    return preferences is not None and object_count >= preferences.modal_threshold
+
+
+class InstanceScopeMixin:
+    """Chooses where an operator looks for other instances of the data it changes."""
+
+    scope: bpy.props.EnumProperty(
+        name='Scope',
+        description='Where to look for other instances',
+        items=SCOPES,
+        default='SCENE',
+    )
+
+    collection: bpy.props.StringProperty(
+        name='Collection',
+        description='Collection to look for other instances in, with its child collections, or the active collection',
+        default='',
+    )
+
+    through_collection_instances: bpy.props.BoolProperty(
+        name='Through Collection Instances',
+        description=('Also update instances inside collections that are instanced in the scope, '
+                     'once per collection rather than once per collection instance'),
+        default=False,
+    )
+
+    def draw_scope(self, layout):
+        layout.prop(self, 'scope')
+        row = layout.row()
+        row.active = self.scope == 'COLLECTION'
+        row.prop_search(self, 'collection', bpy.data, 'collections')
+        layout.prop(self, 'through_collection_instances')
+
+    def lookup_instances(self, context, data_blocks):
+        """Gets the objects in scope using each data-block.
+
+        :return: instance index, or None after reporting an error if the chosen collection does not exist
+        """
+        collection = context.collection
+        if self.collection:
+            collection = bpy.data.collections.get(self.collection)
+            if collection is None:
+                self.report({'ERROR'}, 'No collection named "{}"'.format(self.collection))
+                return None
+        return lookup_instances(context.scene, data_blocks, self.through_collection_instances, self.scope,
+                                context.view_layer, collection)
+
+
+class SeparateOperator(InstanceScopeMixin, ModalBatchMixin, bpy.types.Operator):
     bl_idname = 'mesh.separate_with_instances'
     bl_label = 'Separate + Instances'
     bl_description = 'Separates geometry and re-adding them to other instances'
@@ -13,58 +83,464 @@ class SeparateOperator(bpy.types.Operator):
             ('SELECTED', 'Selection', ''),
             ('MATERIAL', 'By Material', ''),
             ('LOOSE', 'By Loose Parts', ''),
+            ('CHUNKS', 'Into Spatial Chunks', 'Split by location into chunks of about the same number of faces'),
         ),
         default='SELECTED',
     )
 
+    chunk_method: bpy.props.EnumProperty(
+        name='Chunks',
+        items=CHUNK_METHODS,
+        default='GRID',
+    )
+
+    faces_per_chunk: bpy.props.IntProperty(
+        name='Faces per Chunk',
+        description='Number of faces to aim for in each chunk',
+        default=10000,
+        min=1,
+    )
+
+    output: bpy.props.EnumProperty(
+        name='Output',
+        items=(
+            ('OBJECTS', 'Objects', 'Copy every piece onto every instance'),
+            ('COLLECTION_INSTANCES', 'Collection Instances',
+             'Move the pieces into a new collection and replace every instance with an instance of it'),
+        ),
+        default='OBJECTS',
+    )
+
+    backend: bpy.props.EnumProperty(
+        name='Backend',
+        items=(
+            ('OPERATOR', 'Blender', 'Separate with Blender\'s own separate operator, in edit mode'),
+            ('NUMPY', 'NumPy', ('Separate the mesh data directly, without edit mode. '
+                                'Meshes with shape keys or vertex groups, or with custom normals '
+                                'before Blender 4.5, always use Blender\'s operator')),
+        ),
+        default='OPERATOR',
+    )
+
+    duplication: bpy.props.EnumProperty(
+        name='Copies',
+        items=(
+            ('FULL', 'Full', 'Copy each piece with its modifiers, constraints, custom properties and animation'),
+            ('LEAN', 'Lean', ('Create bare objects with only data, transform, parent and collections, '
+                              'plus the chosen extras from each instance')),
+        ),
+        default='FULL',
+    )
+
+    lean_extras: bpy.props.EnumProperty(
+        name='Extras',
+        description='What lean copies take over from the instance they are placed on',
+        items=EXTRAS,
+        options={'ENUM_FLAG'},
+        default=set(),
+    )
+
+    deduplicate: bpy.props.BoolProperty(
+        name='Share Identical Pieces',
+        description='Pieces with the same shape, up to rotation and location, share one mesh data-block',
+        default=False,
+    )
+
+    dedup_tolerance: bpy.props.FloatProperty(
+        name='Tolerance',
+        description='Largest vertex distance for two pieces to count as identical',
+        default=1e-4,
+        min=0.0,
+        precision=5,
+        subtype='DISTANCE',
+    )
+
+    dry_run: bpy.props.BoolProperty(
+        name='Only Estimate',
+        description='Report how many objects and how much data this would create, without changing anything',
+        default=False,
+        options={'SKIP_SAVE'},
+    )
+
+    confirmed: bpy.props.BoolProperty(options={'HIDDEN', 'SKIP_SAVE'})
+
+    # whether execute runs after invoke's confirmation dialog, rather than from a script or redo
+    invoked = False
+
     @classmethod
     def poll(cls, context):
         return bpy.ops.mesh.separate.poll()
 
+    def invoke(self, context, event):
+        self.profiler = PhaseProfiler.from_context(context)
+        if not self.plan(context):
+            return {'CANCELLED'}
+        estimate = self.estimate
+        if (not self.dry_run and not self.confirmed and estimate is not None
+                and estimate.exceeded_limits(get_preferences(context))):
+            # confirming runs execute, which still runs in batches since the operator was invoked
+            self.confirmed = True
+            self.invoked = True
+            return context.window_manager.invoke_props_dialog(self, width=360)
+        return self.start(context, use_modal=True, planned=True)
+
     def execute(self, context):
-        bpy.ops.object.editmode_toggle()
+        return self.start(context, use_modal=self.invoked)
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, 'type')
+        column = layout.column()
+        column.active = self.type == 'CHUNKS'
+        column.prop(self, 'chunk_method')
+        column.prop(self, 'faces_per_chunk')
+        for name in ('output', 'backend'):
+            layout.prop(self, name)
+        column = layout.column()
+        column.active = self.output == 'OBJECTS'
+        column.prop(self, 'duplication')
+        row = column.row()
+        row.active = self.duplication == 'LEAN'
+        row.prop(self, 'lean_extras')
+        layout.prop(self, 'deduplicate')
+        row = layout.row()
+        row.active = self.deduplicate
+        row.prop(self, 'dedup_tolerance')
+        self.draw_scope(layout)
+        layout.prop(self, 'dry_run')
+
+        estimate = getattr(self, 'estimate', None)
+        if estimate is not None:
+            column = layout.column(align=True)
+            for line in estimate.summary():
+                column.label(text=line)
+            for line in estimate.exceeded_limits(get_preferences(context)):
+                column.label(text=line, icon='ERROR')
 
-        initial_obj = context.active_object
+    def plan(self, context) -> bool:
+        """Finds the meshes to separate and their instances, and estimates the cost of separating them.
+
+        The estimate is only made for dry runs, or to check the limits of the add-on preferences
+        when a cheap upper bound of it is over them; otherwise ``estimate`` is None.
+
+        :return: whether instances could be looked up
+        """
+        # every mesh in edit mode is separated once, through the first object using it
+        active_obj = context.active_object
+        self.edit_objects = [active_obj] + [obj for obj in context.objects_in_mode if obj != active_obj]
+        data_to_source = {}
+        for obj in self.edit_objects:
+            data_to_source.setdefault(obj.data, obj)
+        self.sources = sources = list(data_to_source.values())
+
+        # looked up before separating, which does not change the objects using these meshes
+        with self.profiler.phase('instance lookup'):
+            instance_index = self.lookup_instances(context, [source.data for source in sources])
+            if instance_index is None:
+                return False
+            self.linked_objects = {source: other_instances(instance_index, source) for source in sources}
+
+        self.estimate = None
+        # meshes read and split while estimating, reused by the NumPy engine
+        self.splits = {}
+        preferences = get_preferences(context)
+        if not self.dry_run and (self.confirmed or not has_limits(preferences)):
+            return True
+
+        with self.profiler.phase('planning'):
+            separations = [(source.data, self.linked_objects[source]) for source in sources]
+            if not self.dry_run and not bound_separation(separations, self.type, self.output,
+                                                         self.faces_per_chunk).exceeded_limits(preferences):
+                return True
+
+            for source in sources:
+                source.update_from_editmode()
+            splits = [split_mesh(source.data, self.type, self.chunk_method, self.faces_per_chunk)
+                      for source in sources]
+            self.splits = dict(zip(sources, splits))
+            self.estimate = estimate_separation(separations, self.type, self.output, self.chunk_method,
+                                                self.faces_per_chunk, splits)
+        return True
+
+    def separate(self, context, obj) -> list:
+        """Separates one object's mesh, starting and ending in object mode.
+
+        :return: new objects
+        """
         bpy.ops.object.select_all(action='DESELECT')
+        context.view_layer.objects.active = obj
+        obj.select_set(True)
 
-        context.view_layer.objects.active = initial_obj
-        initial_obj.select_set(True)
+        if self.type == 'CHUNKS':
+            # Blender's operator has no spatial chunks
+            if can_separate(obj):
+                return separate_object(obj, self.type, self.chunk_method, self.faces_per_chunk, self.splits.get(obj))
+            return self.separate_chunks(context, obj)
+        if self.backend == 'NUMPY' and can_separate(obj):
+            return separate_object(obj, self.type, split=self.splits.get(obj))
 
         bpy.ops.object.editmode_toggle()
-
         bpy.ops.mesh.separate(type=self.type)
+        bpy.ops.object.editmode_toggle()
 
-        # active object is initial mesh,
         # other selected objects are new objects
+        return [new_obj for new_obj in context.selected_objects if new_obj != obj]
+
+    def separate_chunks(self, context, obj) -> list:
+        """Separates one object's mesh into spatial chunks with Blender's operator, one chunk at a time.
 
-        new_objs = context.selected_objects[1:]
+        Used for meshes the NumPy engine cannot separate. Loose edges and vertices stay in the initial mesh.
 
-        linked_objects = [
-            scene_obj
-            for scene_obj in context.scene.objects
-            if scene_obj != initial_obj and scene_obj.data == initial_obj.data
-        ]
+        :return: new objects
+        """
+        mesh = obj.data
+        group_count, face_groups, _, _ = spatial_groups(MeshArrays(mesh), self.chunk_method, self.faces_per_chunk)
+        # face indices change as chunks are separated, so each face keeps its chunk in an attribute
+        mesh.attributes.new(CHUNK_ATTRIBUTE, 'INT', 'FACE').data.foreach_set('value', face_groups.astype(np.int32))
+
+        tool_settings = context.tool_settings
+        select_mode = tuple(tool_settings.mesh_select_mode)
+        tool_settings.mesh_select_mode = (False, False, True)
+        new_objs = []
+        for group in range(1, group_count):
+            faces = read_array(mesh.attributes[CHUNK_ATTRIBUTE].data, 'value', 1, np.int32) == group
+            if not faces.any():
+                continue
+            corners = ranges(read_array(mesh.polygons, 'loop_start', 1, np.int32)[faces],
+                             read_array(mesh.polygons, 'loop_total', 1, np.int32)[faces])
+            for collection, layer, prop in ((mesh.vertices, '.corner_vert', 'vertex_index'),
+                                            (mesh.edges, '.corner_edge', 'edge_index')):
+                selected = np.zeros(len(collection), dtype=bool)
+                selected[read_layer(mesh, layer, mesh.loops, prop, 1, np.int32)[corners]] = True
+                collection.foreach_set('select', selected)
+            mesh.polygons.foreach_set('select', faces)
+
+            bpy.ops.object.select_all(action='DESELECT')
+            obj.select_set(True)
+            bpy.ops.object.editmode_toggle()
+            bpy.ops.mesh.separate(type='SELECTED')
+            bpy.ops.object.editmode_toggle()
+            new_objs.extend(new_obj for new_obj in context.selected_objects if new_obj != obj)
+        tool_settings.mesh_select_mode = select_mode
 
+        for chunk_obj in [obj] + new_objs:
+            chunk_obj.data.attributes.remove(chunk_obj.data.attributes[CHUNK_ATTRIBUTE])
         for new_obj in new_objs:
-            for linked_scene_object in linked_objects:
-                # get linked scene object matrix, and instance new_obj to its location
-                new_parent = linked_scene_object.parent
-                new_matrix = linked_scene_object.matrix_world.copy()
+            new_obj.select_set(True)
+        return new_objs
+
+    def start(self, context, use_modal, planned=False):
+        if not planned:
+            self.profiler = PhaseProfiler.from_context(context)
+            if not self.plan(context):
+                return {'CANCELLED'}
+        profiler, estimate = self.profiler, self.estimate
+        sources, linked_objects = self.sources, self.linked_objects
+
+        if self.dry_run:
+            self.report({'INFO'}, ', '.join(estimate.summary()))
+            return {'CANCELLED'}
+        exceeded = estimate.exceeded_limits(get_preferences(context)) if estimate is not None else []
+        if exceeded and not self.confirmed:
+            self.report({'ERROR'}, 'Not separated, {}. Run from the menu to confirm'.format('; '.join(exceeded)))
+            return {'CANCELLED'}
+
+        with profiler.phase('separation'):
+            bpy.ops.object.editmode_toggle()
+            # joining the pieces back would reorder material slots, so rolling back restores these copies
+            self.mesh_copies = {}
+            self.object_materials = {}
+            if self.output != 'COLLECTION_INSTANCES':
+                self.mesh_copies = {source: source.data.copy() for source in sources}
+                # separating drops the slots of object-linked materials along with unused mesh slots
+                self.object_materials = {
+                    obj: [(slot.link, slot.material) for slot in obj.material_slots]
+                    for source in sources for obj in (source, *linked_objects[source])
+                    if any(slot.link == 'OBJECT' for slot in obj.material_slots)
+                }
+            self.separations = separations = [(source, self.separate(context, source)) for source in sources]
+
+        if self.deduplicate:
+            with profiler.phase('deduplication'):
+                deduplicate_separations(separations, self.dedup_tolerance, context.view_layer)
+
+        if self.output == 'COLLECTION_INSTANCES':
+            with profiler.phase('duplication'):
+                collections, collection_instances = collect_separations(separations, linked_objects,
+                                                                        context.view_layer)
+            with profiler.phase('transform'):
+                context.view_layer.update()
+
+            with profiler.phase('cleanup'):
+                bpy.ops.object.select_all(action='DESELECT')
+                for collection_instance in collection_instances:
+                    collection_instance.select_set(True)
+                context.view_layer.objects.active = collection_instances[0]
+
+            self.report({'INFO'}, 'Separated into {}'.format(
+                ', '.join('collection "{}"'.format(collection.name) for collection in collections)
+            ))
+            profiler.finish(self)
+            return {'FINISHED'}
 
-                bpy.ops.object.editmode_toggle()
+        with profiler.phase('separation'):
+            self.enter_edit_mode(context)
+            for _, new_objs in separations:
+                for new_obj in new_objs:
+                    new_obj.select_set(True)
+
+        # one combined batch over the instances of every separated mesh
+        pieces_of = dict(separations)
+        targets = instance_targets(separations, linked_objects)
+        self.duplicates = []
+        extras = self.lean_extras if self.duplication == 'LEAN' else None
+
+        def duplicate_range(start, stop):
+            # copy each new object to every linked scene object's location
+            with profiler.phase('duplication'):
+                self.duplicates.extend(duplicate_targets(targets[start:stop], pieces_of, extras))
+
+        most_pieces = max((len(new_objs) for _, new_objs in separations), default=0)
+        object_count = sum(len(pieces_of[source]) for source, _ in targets)
+        self.job = BatchJob(len(targets), duplicate_range, batch_size=256 // max(1, most_pieces))
+        return self.run(context, use_modal and use_modal_for(context, object_count))
+
+    def enter_edit_mode(self, context):
+        """Puts every object that was in edit mode back into it, from object mode."""
+        bpy.ops.object.select_all(action='DESELECT')
+        for obj in self.edit_objects:
+            obj.select_set(True)
+        context.view_layer.objects.active = self.edit_objects[0]
+        bpy.ops.object.editmode_toggle()
 
-                with context.temp_override(selected_objects=[new_obj]):
-                    bpy.ops.object.duplicate(linked=True)
+    def finish(self, context):
+        profiler = self.profiler
+        with profiler.phase('transform'):
+            context.view_layer.update()
 
-                bpy.ops.object.editmode_toggle()
-                new_obj.parent = new_parent
-                new_obj.matrix_world = new_matrix
-                new_obj.select_set(True)
+        with profiler.phase('cleanup'):
+            # looking objects up by name in the view layer is a linear search
+            view_layer_objects = set(context.view_layer.objects)
+            for new_obj in self.duplicates:
+                if new_obj in view_layer_objects:
+                    new_obj.select_set(True)
+            bpy.data.batch_remove(self.mesh_copies.values())
 
+        profiler.finish(self)
         return {'FINISHED'}
 
+    def rollback(self, context):
+        """Removes the copies made so far and the separated pieces, and restores the initial meshes."""
+        bpy.data.batch_remove(self.duplicates)
+
+        bpy.ops.object.editmode_toggle()
+        pieces = [new_obj for _, new_objs in self.separations for new_obj in new_objs]
+        piece_meshes = {new_obj.data for new_obj in pieces}
+        bpy.data.batch_remove(pieces)
+        bpy.data.batch_remove(piece_meshes)
+
+        for source, mesh_copy in self.mesh_copies.items():
+            separated_mesh = source.data
+            name = separated_mesh.name
+            # every instance, in or out of scope, gets the mesh from before
+            separated_mesh.user_remap(mesh_copy)
+            bpy.data.meshes.remove(separated_mesh)
+            mesh_copy.name = name
+        for obj, slots in self.object_materials.items():
+            for slot, (link, material) in zip(obj.material_slots, slots):
+                slot.link = link
+                if link == 'OBJECT':
+                    slot.material = material
+        self.enter_edit_mode(context)
+
+
+class JoinOperator(InstanceScopeMixin, bpy.types.Operator):
+    bl_idname = 'object.join_with_instances'
+    bl_label = 'Join + Instances'
+    bl_description = ('Joins the selected objects into the active one, and removes the objects '
+                      'placed the same way around every other instance of it')
+    bl_options = {'REGISTER', 'UNDO'}
+
+    tolerance: bpy.props.FloatProperty(
+        name='Tolerance',
+        description='Largest difference in any matrix element for an object to count as placed like a selected one',
+        default=1e-4,
+        min=0.0,
+        precision=5,
+    )
+
+    @classmethod
+    def poll(cls, context):
+        return bpy.ops.object.join.poll()
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, 'tolerance')
+        self.draw_scope(layout)
+
+    def execute(self, context):
+        profiler = PhaseProfiler.from_context(context)
+        target = context.active_object
+        pieces = [obj for obj in context.selected_objects if obj != target and obj.type == 'MESH']
+        if not pieces:
+            self.report({'ERROR'}, 'Select the objects to join, then the object to join them into')
+            return {'CANCELLED'}
+        if any(piece.data == target.data for piece in pieces):
+            self.report({'ERROR'}, 'Selected objects share the active object\'s mesh')
+            return {'CANCELLED'}
+
+        with profiler.phase('instance lookup'):
+            instance_index = self.lookup_instances(context, [target.data] + [piece.data for piece in pieces])
+        if instance_index is None:
+            return {'CANCELLED'}
+
+        # matched before joining, while the pieces are still in place
+        with profiler.phase('planning'):
+            relative = relative_matrices(pieces, target)
+            groups, unmatched = match_instance_groups(target, pieces, relative,
+                                                      other_instances(instance_index, target),
+                                                      instance_index, self.tolerance)
+
+        with profiler.phase('join'):
+            self.join(context, target, pieces, relative, unmatched)
+
+        with profiler.phase('cleanup'):
+            removed_count = remove_joined(groups)
+            context.view_layer.update()
+
+        self.report({'INFO'}, 'Joined {} objects into {} instances, removed {} objects'.format(
+            len(pieces), len(groups) + 1, len(pieces) + removed_count
+        ))
+        if unmatched:
+            self.report({'WARNING'}, '{} instances without every joined object kept the previous mesh'.format(
+                len(unmatched)
+            ))
+        profiler.finish(self)
+        return {'FINISHED'}
+
+    def join(self, context, target, pieces, relative, unmatched):
+        """Joins the pieces into the target's mesh, once for all of its instances.
+
+        Instances the pieces are not arranged around keep a copy of the mesh from before.
+        """
+        previous_mesh = target.data.copy() if unmatched else None
+
+        if can_join(target, pieces, relative):
+            join_objects(target, pieces, relative)
+        else:
+            bpy.ops.object.select_all(action='DESELECT')
+            for piece in pieces:
+                piece.select_set(True)
+            target.select_set(True)
+            context.view_layer.objects.active = target
+            bpy.ops.object.join()
+
+        for instance in unmatched:
+            instance.data = previous_mesh
+
+
+class SetOriginOperator(InstanceScopeMixin, ModalBatchMixin, bpy.types.Operator):
 
-class SetOriginOperator(bpy.types.Operator):
     bl_idname = 'object.origin_set_with_instances'
     bl_label = 'Set Origin + Instances'
     bl_options = {'REGISTER', 'UNDO'}
@@ -90,22 +566,61 @@ class SetOriginOperator(bpy.types.Operator):
         default='MEDIAN',
     )
 
+    dry_run: bpy.props.BoolProperty(
+        name='Only Estimate',
+        description='Report how many instances this would move, without changing anything',
+        default=False,
+        options={'SKIP_SAVE'},
+    )
+
     @classmethod
     def poll(cls, context):
         return bpy.ops.object.origin_set.poll()
 
+    def invoke(self, context, event):
+        return self.start(context, use_modal=True)
+
     def execute(self, context):
-        prev_cursor_location = context.scene.cursor.location.copy()
-        prev_active_object = context.view_layer.objects.active
-        selection = context.selected_objects[:]
-        selection_to_other_instances = {
-            obj: [
-                scene_obj
-                for scene_obj in context.scene.objects
-                if scene_obj != obj and scene_obj.data == obj.data
-            ]
-            for obj in selection
-        }
+        return self.start(context, use_modal=False)
+
+    def draw(self, context):
+        layout = self.layout
+        for name in ('type', 'center'):
+            layout.prop(self, name)
+        self.draw_scope(layout)
+        layout.prop(self, 'dry_run')
+
+        estimate = getattr(self, 'estimate', None)
+        if estimate is not None:
+            column = layout.column(align=True)
+            for line in estimate.summary():
+                column.label(text=line)
+
+    def start(self, context, use_modal):
+        profiler = self.profiler = PhaseProfiler.from_context(context)
+
+        self.prev_active_object = context.view_layer.objects.active
+        self.selection = selection = context.selected_objects[:]
+
+        # each data-block is processed once, through the first selected object using it
+        data_to_initial_obj = {}
+        for obj in selection:
+            if obj.data is not None:
+                data_to_initial_obj.setdefault(obj.data, obj)
+
+        with profiler.phase('instance lookup'):
+            instance_index = self.lookup_instances(context, data_to_initial_obj.keys())
+        if instance_index is None:
+            return {'CANCELLED'}
+
+        with profiler.phase('planning'):
+            moved_count = 0
+            if self.type != 'GEOMETRY_ORIGIN':
+                moved_count = sum(len(other_instances(instance_index, obj)) for obj in data_to_initial_obj.values())
+            self.estimate = Estimate(moved_objects=moved_count)
+        if self.dry_run:
+            self.report({'INFO'}, ', '.join(self.estimate.summary()))
+            return {'CANCELLED'}
 
         def force_selection(selected_objects):
             bpy.ops.object.select_all(action='DESELECT')
@@ -113,35 +628,76 @@ class SetOriginOperator(bpy.types.Operator):
                 obj.select_set(True)
             context.view_layer.objects.active = selected_objects[0]
 
-        meshes_to_delete_after = []
-        for initial_obj in selection:
-            linked_objects = selection_to_other_instances[initial_obj]
+        initial_objects = list(data_to_initial_obj.values())
+        prev_matrices = [obj.matrix_world.copy() for obj in initial_objects]
+        # origins are moved on the data directly where possible, and with origin_set otherwise
+        direct_objects = [obj for obj in initial_objects if can_move_origin(obj)]
+        with profiler.phase('origin'):
+            offsets = dict(zip(direct_objects, move_origins(direct_objects, self.type, self.center,
+                                                            context.scene.cursor.location)))
+            for initial_obj, prev_matrix in zip(initial_objects, prev_matrices):
+                if initial_obj not in offsets:
+                    force_selection([initial_obj])
+                    bpy.ops.object.origin_set(type=self.type, center=self.center)
+                    offsets[initial_obj] = prev_matrix.inverted_safe() @ initial_obj.matrix_world
+            # instances parented to moved objects are placed from their parents' new world matrices
+            context.view_layer.update()
+
+        # (object, matrix before, offset, moved directly) of every object whose origin moved, to roll back
+        self.origin_changes = []
+        if self.type != 'GEOMETRY_ORIGIN':
+            # only the shared data moves for geometry to origin, so every instance keeps its transform
+            self.origin_changes = [(obj, prev_matrix, offsets[obj], obj in direct_objects)
+                                   for obj, prev_matrix in zip(initial_objects, prev_matrices)]
+        moved_objects, worlds, moved_offsets = instance_moves(
+            [obj for obj, *_ in self.origin_changes], [offset for _, _, offset, _ in self.origin_changes],
+            {obj: other_instances(instance_index, obj) for obj, *_ in self.origin_changes},
+        )
 
-            prev_matrix = initial_obj.matrix_world.copy()
-            obj_data_name = initial_obj.data.name
-            force_selection([initial_obj])
-            bpy.ops.object.make_single_user(object=False, obdata=True, material=False, animation=False)
-            bpy.ops.object.origin_set(type=self.type, center=self.center)
-            initial_obj.data.rename(obj_data_name, mode='ALWAYS')
+        self.moved_objects = moved_objects
+        self.moved_offsets = moved_offsets
+        self.prev_bases = gather_matrices(moved_objects, 'matrix_basis')
+        new_worlds = dict(zip(moved_objects, worlds))
 
-            rel_cursor_location = prev_matrix.inverted() @ context.scene.cursor.location
-            for obj in linked_objects:
-                force_selection([obj])
-                bpy.ops.object.make_single_user(object=False, obdata=True, material=False, animation=False)
+        def move_range(start, stop):
+            with profiler.phase('transform'):
+                set_world_matrices(moved_objects[start:stop], worlds[start:stop], new_worlds)
+                keep_children_in_place(moved_objects[start:stop], moved_offsets[start:stop], new_worlds)
 
-                meshes_to_delete_after.append(obj.data)
-                context.scene.cursor.location = obj.matrix_world @ rel_cursor_location
-                bpy.ops.object.origin_set(type=self.type, center=self.center)
-                obj.data = initial_obj.data
+        self.job = BatchJob(len(moved_objects), move_range, batch_size=1024)
+        return self.run(context, use_modal and use_modal_for(context, len(moved_objects)))
 
+    def restore_selection(self, context):
         bpy.ops.object.select_all(action='DESELECT')
-        for obj in selection:
+        for obj in self.selection:
             obj.select_set(True)
-        context.view_layer.objects.active = prev_active_object
-        context.scene.cursor.location = prev_cursor_location
+        context.view_layer.objects.active = self.prev_active_object
+
+    def finish(self, context):
+        profiler = self.profiler
+        with profiler.phase('transform'):
+            context.view_layer.update()
 
-        for mesh in meshes_to_delete_after:
-            assert mesh.users == 0
-            bpy.data.meshes.remove(mesh)
+        with profiler.phase('cleanup'):
+            self.restore_selection(context)
 
+        profiler.finish(self)
         return {'FINISHED'}
+
+    def rollback(self, context):
+        """Moves the instances handled so far back, and undoes the origin change on every data-block."""
+        done = self.job.done
+        write_bases(self.moved_objects[:done], self.prev_bases[:done])
+        inverses = [offset.inverted_safe() for offset in self.moved_offsets[:done]]
+        keep_children_in_place(self.moved_objects[:done], inverses, set(self.moved_objects))
+
+        for obj, prev_matrix, offset, moved_directly in self.origin_changes:
+            # the data moved by the inverse of the offset
+            obj.data.transform(offset, shape_keys=True)
+            obj.matrix_world = prev_matrix
+            if moved_directly:
+                for child in obj.children:
+                    child.matrix_parent_inverse = offset @ child.matrix_parent_inverse
+
+        context.view_layer.update()
+        self.restore_selection(context)
@@ -0,0 +1,408 @@
+import bpy
+import numpy as np
+
+from .chunking import chunk_labels
+
+ATTRIBUTE_LAYOUTS = {
+    # data type: (foreach property, components, dtype)
+    'FLOAT': ('value', 1, np.float32),
+    'INT': ('value', 1, np.int32),
+    'INT8': ('value', 1, np.int32),
+    'BOOLEAN': ('value', 1, bool),
+    'FLOAT2': ('vector', 2, np.float32),
+    'INT32_2D': ('value', 2, np.int32),
+    'INT16_2D': ('value', 2, np.int32),
+    'FLOAT_VECTOR': ('vector', 3, np.float32),
+    'FLOAT_COLOR': ('color', 4, np.float32),
+    'BYTE_COLOR': ('color', 4, np.float32),
+    'QUATERNION': ('value', 4, np.float32),
+    'FLOAT4X4': ('value', 16, np.float32),
+}
+
+
+def read_array(collection, prop: str, components: int, dtype) -> np.ndarray:
+    """Reads one property of every item in a collection with foreach_get."""
+    array = np.empty(len(collection) * components, dtype=dtype)
+    collection.foreach_get(prop, array)
+    return array.reshape(-1, components) if components > 1 else array
+
+
+def layer_attribute(mesh, attribute_name: str, components: int):
+    """Gets the generic attribute storing a built-in mesh layer, if this Blender version has one."""
+    attribute = mesh.attributes.get(attribute_name)
+    if attribute is None:
+        return None
+    layout = ATTRIBUTE_LAYOUTS.get(attribute.data_type)
+    # some versions report internal layers with a type that does not match their data
+    return attribute if layout is not None and layout[1] == components else None
+
+
+def read_layer(mesh, attribute_name: str, collection, prop: str, components: int, dtype) -> np.ndarray:
+    """Reads a built-in mesh layer.
+
+    Goes through its generic attribute when the Blender version stores it as one,
+    which is much faster than the per-element vertex, edge and loop collections.
+    """
+    attribute = layer_attribute(mesh, attribute_name, components)
+    if attribute is not None:
+        return read_array(attribute.data, ATTRIBUTE_LAYOUTS[attribute.data_type][0], components, dtype)
+    return read_array(collection, prop, components, dtype)
+
+
+def write_layer(mesh, attribute_name: str, collection, prop: str, values: np.ndarray):
+    """Writes a built-in mesh layer, through its generic attribute when there is one."""
+    components = values.shape[1] if values.ndim > 1 else 1
+    attribute = layer_attribute(mesh, attribute_name, components)
+    if attribute is not None:
+        attribute.data.foreach_set(ATTRIBUTE_LAYOUTS[attribute.data_type][0], values.ravel())
+    else:
+        collection.foreach_set(prop, values.ravel())
+
+
+def ranges(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Concatenates ``range(start, start + length)`` for every start and length."""
+    offsets = np.cumsum(lengths) - lengths
+    return np.repeat(starts - offsets, lengths) + np.arange(lengths.sum())
+
+
+def connected_components(vertex_count: int, edge_verts: np.ndarray) -> np.ndarray:
+    """Labels every vertex with the lowest vertex index connected to it through edges.
+
+    Vectorized union-find: labels are lowered across edges, then pointer jumping
+    shortcuts label chains, until nothing changes.
+    """
+    labels = np.arange(vertex_count)
+    if len(edge_verts) == 0:
+        return labels
+
+    a, b = edge_verts[:, 0], edge_verts[:, 1]
+    while True:
+        lowest = np.minimum(labels[a], labels[b])
+        new_labels = labels.copy()
+        np.minimum.at(new_labels, a, lowest)
+        np.minimum.at(new_labels, b, lowest)
+        while True:
+            jumped = new_labels[new_labels]
+            if np.array_equal(jumped, new_labels):
+                break
+            new_labels = jumped
+
+        if np.array_equal(new_labels, labels):
+            return labels
+        labels = new_labels
+
+
+def mesh_geometry(mesh) -> tuple:
+    """Reads the vertex positions, corner vertices, face starts and face sizes of a mesh."""
+    return (
+        read_layer(mesh, 'position', mesh.vertices, 'co', 3, np.float32),
+        read_layer(mesh, '.corner_vert', mesh.loops, 'vertex_index', 1, np.int32),
+        read_array(mesh.polygons, 'loop_start', 1, np.int32),
+        read_array(mesh.polygons, 'loop_total', 1, np.int32),
+    )
+
+
+class MeshArrays:
+    """Topology, selection and generic attributes of a mesh, read once with foreach_get."""
+
+    def __init__(self, mesh):
+        self.co = read_layer(mesh, 'position', mesh.vertices, 'co', 3, np.float32)
+        self.edge_verts = read_layer(mesh, '.edge_verts', mesh.edges, 'vertices', 2, np.int32)
+        self.corner_verts = read_layer(mesh, '.corner_vert', mesh.loops, 'vertex_index', 1, np.int32)
+        self.corner_edges = read_layer(mesh, '.corner_edge', mesh.loops, 'edge_index', 1, np.int32)
+        self.face_starts = read_array(mesh.polygons, 'loop_start', 1, np.int32)
+        self.face_totals = read_array(mesh.polygons, 'loop_total', 1, np.int32)
+        self.face_materials = read_layer(mesh, 'material_index', mesh.polygons, 'material_index', 1, np.int32)
+
+        self.vert_select = read_layer(mesh, '.select_vert', mesh.vertices, 'select', 1, bool)
+        self.edge_select = read_layer(mesh, '.select_edge', mesh.edges, 'select', 1, bool)
+        self.face_select = read_layer(mesh, '.select_poly', mesh.polygons, 'select', 1, bool)
+
+        # edges used by no face, and vertices used by no edge
+        edge_used = np.zeros(len(self.edge_verts), dtype=bool)
+        edge_used[self.corner_edges] = True
+        self.loose_edges = np.flatnonzero(~edge_used)
+        vert_used = np.zeros(len(self.co), dtype=bool)
+        vert_used[self.edge_verts.ravel()] = True
+        self.loose_verts = np.flatnonzero(~vert_used)
+
+        self.vert_remap = np.empty(len(self.co), dtype=np.int32)
+        self.edge_remap = np.empty(len(self.edge_verts), dtype=np.int32)
+
+        self.attributes = []
+        for attribute in mesh.attributes:
+            name = attribute.name
+            if name.startswith('.') or name == 'position' or attribute.data_type not in ATTRIBUTE_LAYOUTS:
+                continue
+            prop, components, dtype = ATTRIBUTE_LAYOUTS[attribute.data_type]
+            values = read_array(attribute.data, prop, components, dtype)
+            self.attributes.append((name, attribute.data_type, attribute.domain, prop, values))
+
+        self.materials = list(mesh.materials)
+        active_uv = mesh.uv_layers.active
+        self.active_uv_name = active_uv.name if active_uv is not None else None
+        self.render_uv_name = next((uv.name for uv in mesh.uv_layers if uv.active_render), None)
+
+
+def sorted_by_group(groups: np.ndarray, group_count: int) -> tuple:
+    """Gets element indices sorted by group, and the slice bounds of every group."""
+    order = np.argsort(groups, kind='stable')
+    bounds = np.searchsorted(groups[order], np.arange(group_count + 1))
+    return order, bounds
+
+
+def group_parts(arrays: MeshArrays, group_count: int, face_groups, edge_groups, vert_groups) -> list:
+    """Splits the mesh into parts from a group per face, per loose edge and per loose vertex."""
+    face_order, face_bounds = sorted_by_group(face_groups, group_count)
+    edge_order, edge_bounds = sorted_by_group(edge_groups, group_count)
+    vert_order, vert_bounds = sorted_by_group(vert_groups, group_count)
+    # corners of the faces in face_order, so each group's corners are one slice too
+    corner_order = ranges(arrays.face_starts[face_order], arrays.face_totals[face_order])
+    corner_bounds = np.concatenate(([0], np.cumsum(arrays.face_totals[face_order])))[face_bounds]
+
+    return [
+        (
+            face_order[face_bounds[group]:face_bounds[group + 1]],
+            corner_order[corner_bounds[group]:corner_bounds[group + 1]],
+            arrays.loose_edges[edge_order[edge_bounds[group]:edge_bounds[group + 1]]],
+            arrays.loose_verts[vert_order[vert_bounds[group]:vert_bounds[group + 1]]],
+        )
+        for group in range(group_count)
+    ]
+
+
+def face_centers(arrays: MeshArrays) -> np.ndarray:
+    """Gets the mean position of every face's corners."""
+    if not len(arrays.face_totals):
+        return np.empty((0, 3))
+    corners = ranges(arrays.face_starts, arrays.face_totals)
+    offsets = np.cumsum(arrays.face_totals) - arrays.face_totals
+    sums = np.add.reduceat(arrays.co[arrays.corner_verts[corners]].astype(np.float64), offsets)
+    return sums / arrays.face_totals[:, np.newaxis]
+
+
+def spatial_groups(arrays: MeshArrays, chunk_method: str, faces_per_chunk: int) -> tuple:
+    """Groups faces by spatial chunk of their centers, and loose edges and vertices by their positions.
+
+    :return: group count, and the group of every face, loose edge and loose vertex
+    """
+    co = arrays.co.astype(np.float64)
+    points = np.concatenate((
+        face_centers(arrays),
+        co[arrays.edge_verts[arrays.loose_edges]].mean(axis=1).reshape(-1, 3),
+        co[arrays.loose_verts],
+    ))
+    chunk_count = -(-len(points) // max(1, faces_per_chunk))
+    labels = chunk_labels(points, chunk_method, chunk_count)
+    face_count, edge_count = len(arrays.face_totals), len(arrays.loose_edges)
+    return (
+        labels.max(initial=-1) + 1,
+        labels[:face_count],
+        labels[face_count:face_count + edge_count],
+        labels[face_count + edge_count:],
+    )
+
+
+def split_parts(arrays: MeshArrays, separate_type: str, chunk_method: str = 'GRID',
+                faces_per_chunk: int = 10000) -> list:
+    """Splits the mesh into parts the way ``bpy.ops.mesh.separate`` does, or into spatial chunks.
+
+    The first part stays in the original mesh, every other part becomes a new mesh.
+
+    :param chunk_method: identifier from ``CHUNK_METHODS``, for the CHUNKS type
+    :param faces_per_chunk: faces to aim for in each chunk, for the CHUNKS type
+    :return: list of (faces, corners, extra edges, extra vertices) index arrays
+    """
+    if separate_type == 'CHUNKS':
+        return group_parts(arrays, *spatial_groups(arrays, chunk_method, faces_per_chunk))
+
+    if separate_type == 'LOOSE':
+        labels = connected_components(len(arrays.co), arrays.edge_verts)
+        _, vert_groups = np.unique(labels, return_inverse=True)
+        return group_parts(
+            arrays, vert_groups.max(initial=-1) + 1,
+            vert_groups[arrays.corner_verts[arrays.face_starts]],
+            vert_groups[arrays.edge_verts[arrays.loose_edges, 0]],
+            vert_groups[arrays.loose_verts],
+        )
+
+    if separate_type == 'MATERIAL':
+        _, first_faces, materials = np.unique(arrays.face_materials, return_index=True, return_inverse=True)
+        # like Blender, materials split off in the order their first face comes,
+        # and the last one stays in the original mesh, with the loose geometry that has no material
+        group_count = max(len(first_faces), 1)
+        ranks = np.empty(len(first_faces), dtype=np.int64)
+        ranks[np.argsort(first_faces)] = np.arange(len(first_faces))
+        face_groups = (ranks[materials.ravel()] + 1) % group_count
+        return group_parts(
+            arrays, group_count, face_groups,
+            np.zeros(len(arrays.loose_edges), dtype=np.int64),
+            np.zeros(len(arrays.loose_verts), dtype=np.int64),
+        )
+
+    if separate_type == 'SELECTED':
+        # selected vertices and edges are copied to the new mesh,
+        # but stay in the original wherever unselected faces still use them
+        selected_faces = np.flatnonzero(arrays.face_select)
+        kept_faces = np.flatnonzero(~arrays.face_select)
+        return [
+            (
+                kept_faces,
+                ranges(arrays.face_starts[kept_faces], arrays.face_totals[kept_faces]),
+                arrays.loose_edges[~arrays.edge_select[arrays.loose_edges]],
+                arrays.loose_verts[~arrays.vert_select[arrays.loose_verts]],
+            ),
+            (
+                selected_faces,
+                ranges(arrays.face_starts[selected_faces], arrays.face_totals[selected_faces]),
+                np.flatnonzero(arrays.edge_select),
+                np.flatnonzero(arrays.vert_select),
+            ),
+        ]
+
+    raise ValueError('Unsupported separate type: {}'.format(separate_type))
+
+
+def split_mesh(mesh, separate_type: str, chunk_method: str = 'GRID', faces_per_chunk: int = 10000) -> tuple:
+    """Reads a mesh and splits it into parts, see ``split_parts``.
+
+    :return: the ``MeshArrays`` read, and the parts
+    """
+    arrays = MeshArrays(mesh)
+    return arrays, split_parts(arrays, separate_type, chunk_method, faces_per_chunk)
+
+
+def write_geometry(mesh, co, edge_verts, corner_verts, corner_edges, face_totals):
+    """Adds vertices, edges, face corners and faces to an empty mesh, with corners in face order."""
+    mesh.vertices.add(len(co))
+    write_layer(mesh, 'position', mesh.vertices, 'co', co)
+    mesh.edges.add(len(edge_verts))
+    write_layer(mesh, '.edge_verts', mesh.edges, 'vertices', edge_verts)
+    mesh.loops.add(len(corner_verts))
+    write_layer(mesh, '.corner_vert', mesh.loops, 'vertex_index', corner_verts)
+    write_layer(mesh, '.corner_edge', mesh.loops, 'edge_index', corner_edges)
+    mesh.polygons.add(len(face_totals))
+    mesh.polygons.foreach_set('loop_start', (np.cumsum(face_totals) - face_totals).astype(np.int32))
+    if not bpy.types.MeshPolygon.bl_rna.properties['loop_total'].is_readonly:
+        mesh.polygons.foreach_set('loop_total', face_totals)
+
+
+def write_attributes(mesh, attributes, active_uv_name=None, render_uv_name=None):
+    """Writes generic attributes, creating any the mesh does not have yet.
+
+    :param attributes: (name, data type, domain, foreach property, values) of each attribute
+    """
+    for name, data_type, domain, prop, values in attributes:
+        attribute = mesh.attributes.get(name)
+        if attribute is None:
+            attribute = mesh.attributes.new(name, data_type, domain)
+        attribute.data.foreach_set(prop, values.ravel())
+
+    if active_uv_name is not None:
+        mesh.uv_layers.active = mesh.uv_layers[active_uv_name]
+    if render_uv_name is not None:
+        mesh.uv_layers[render_uv_name].active_render = True
+
+
+def fill_mesh(mesh, arrays: MeshArrays, part: tuple):
+    """Fills an empty mesh with one part of the mesh read into ``arrays``.
+
+    :param part: faces, their corners, and any other edges and vertices to keep
+    """
+    faces, corners, extra_edges, extra_verts = part
+    edges = np.unique(np.concatenate((arrays.corner_edges[corners], extra_edges)))
+    # every face corner's vertex is also on one of the face's edges
+    verts = np.unique(np.concatenate((arrays.edge_verts[edges].ravel(), extra_verts)))
+
+    # old to new indices, scattered into arrays reused across parts
+    vert_remap, edge_remap = arrays.vert_remap, arrays.edge_remap
+    vert_remap[verts] = np.arange(len(verts), dtype=np.int32)
+    edge_remap[edges] = np.arange(len(edges), dtype=np.int32)
+
+    write_geometry(
+        mesh, arrays.co[verts], vert_remap[arrays.edge_verts[edges]],
+        vert_remap[arrays.corner_verts[corners]], edge_remap[arrays.corner_edges[corners]],
+        arrays.face_totals[faces],
+    )
+
+    domain_indices = {'POINT': verts, 'EDGE': edges, 'FACE': faces, 'CORNER': corners}
+    write_attributes(
+        mesh,
+        [(name, data_type, domain, prop, values[domain_indices[domain]])
+         for name, data_type, domain, prop, values in arrays.attributes],
+        arrays.active_uv_name, arrays.render_uv_name,
+    )
+
+    mesh.update()
+
+
+def can_separate(obj) -> bool:
+    """Whether the NumPy engine keeps everything about this object's mesh.
+
+    Shape keys and vertex group weights are not attributes, so they would be lost,
+    and neither are custom normals before Blender 4.5 stores them in a ``custom_normal`` attribute.
+    """
+    if obj.type != 'MESH':
+        return False
+    mesh = obj.data
+    return (
+        mesh.shape_keys is None and not obj.vertex_groups
+        and (not mesh.has_custom_normals or 'custom_normal' in mesh.attributes)
+    )
+
+
+def separate_object(obj, separate_type: str, chunk_method: str = 'GRID', faces_per_chunk: int = 10000,
+                    split=None) -> list:
+    """Separates a mesh object in object mode, without operators or edit mode.
+
+    The original mesh keeps the first part, and each other part becomes a new object,
+    copied from ``obj`` and linked to the same collections, like ``bpy.ops.mesh.separate``.
+
+    :param obj: mesh object to separate
+    :param separate_type: 'SELECTED', 'MATERIAL', 'LOOSE' or 'CHUNKS'
+    :param chunk_method: see ``split_parts``
+    :param faces_per_chunk: see ``split_parts``
+    :param split: (arrays, parts) from ``split_mesh``, when the mesh was already split
+    :return: the new objects
+    """
+    mesh = obj.data
+    arrays, parts = split or split_mesh(mesh, separate_type, chunk_method, faces_per_chunk)
+
+    def part_materials(part):
+        # like Blender, pieces split by material only keep the material they were split by
+        faces = part[0]
+        if separate_type != 'MATERIAL' or not len(faces):
+            return arrays.materials
+        material_index = arrays.face_materials[faces[0]]
+        return arrays.materials[material_index:material_index + 1] or arrays.materials
+
+    def fill_part(target_mesh, part):
+        materials = part_materials(part)
+        if len(target_mesh.materials):
+            target_mesh.materials.clear()
+        for material in materials:
+            target_mesh.materials.append(material)
+        fill_mesh(target_mesh, arrays, part)
+        if materials is not arrays.materials:
+            target_mesh.polygons.foreach_set('material_index', np.zeros(len(part[0]), dtype=np.int32))
+
+    collections = obj.users_collection
+    new_objs = []
+    for part in parts[1:]:
+        if not any(len(indices) for indices in part):
+            continue
+
+        new_mesh = bpy.data.meshes.new(mesh.name)
+        fill_part(new_mesh, part)
+
+        new_obj = obj.copy()
+        new_obj.data = new_mesh
+        for collection in collections:
+            collection.objects.link(new_obj)
+        new_objs.append(new_obj)
+
+    if new_objs:
+        mesh.clear_geometry()
+        fill_part(mesh, parts[0])
+
+    return new_objs
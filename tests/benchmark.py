@@ -0,0 +1,315 @@
+"""Headless benchmarks for Separate + Instances and Set Origin + Instances.
+
+Build the add-on zip first (``python zip.py``), then run either::
+
+    python tests/benchmark.py --output bench.json
+    blender -b --python tests/benchmark.py -- --output bench.json
+
+Each case builds a parametric scene, runs one operator and records its wall time,
+the number of objects it created and the peak number of mesh data-blocks
+(sampled before and after the operator).
+Duplication cases compare full and lean copies of decorated instances,
+recording the time per created object and the playback time afterwards.
+Sweeps vary one parameter at a time around a default scene.
+With ``--baseline``, exits with status 1 if any case got slower than the stored results.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import bpy
+import addon_utils
+
+DEFAULT_PARAMS = {
+    'grid_size': 8,  # each loose part is a grid_size x grid_size quad grid
+    'parts': 8,  # loose parts per mesh
+    'instances': 50,  # objects sharing each mesh
+    'parent_depth': 0,  # empties above each instance
+    'meshes': 1,  # distinct meshes selected
+}
+
+SWEEPS = {
+    'grid_size': (4, 16, 64),
+    'parts': (1, 32, 128),
+    'instances': (10, 200, 1000),
+    'parent_depth': (1, 4),
+    'meshes': (4, 16),
+}
+
+QUICK_SWEEPS = {
+    'grid_size': (16,),
+    'parts': (32,),
+    'instances': (200,),
+    'parent_depth': (2,),
+    'meshes': (4,),
+}
+
+SEPARATE_TYPES = ('SELECTED', 'MATERIAL', 'LOOSE', 'CHUNKS')
+FACES_PER_CHUNK = 128  # four chunks of the default mesh
+DUPLICATIONS = ('FULL', 'LEAN')
+PLAYBACK_FRAMES = 10
+ORIGIN_TYPES = ('GEOMETRY_ORIGIN', 'ORIGIN_GEOMETRY', 'ORIGIN_CURSOR',
+                'ORIGIN_CENTER_OF_MASS', 'ORIGIN_CENTER_OF_VOLUME')
+ORIGIN_CENTERS = ('MEDIAN', 'BOUNDS')
+
+
+def install_addon():
+    """Installs and enables the add-on from the zip file next to the tests folder."""
+    parent_dir = Path(__file__).parent.parent
+    zip_path = next((parent_dir / f for f in os.listdir(parent_dir) if f.endswith('.zip')), None)
+    if zip_path is None:
+        raise FileNotFoundError('No zip file to install into Blender! Run zip.py first.')
+
+    bpy.ops.preferences.addon_install(filepath=str(zip_path))
+    addon_utils.modules_refresh()
+    bpy.ops.preferences.addon_enable(module='separate_with_instances')
+
+
+def build_mesh(name, grid_size, parts):
+    """Builds a mesh of ``parts`` loose quad grids, alternating between two materials."""
+    verts = []
+    faces = []
+    for part in range(parts):
+        offset = len(verts)
+        verts.extend(
+            (part * (grid_size + 1) + x, y, (x * y) % 3 * 0.1)
+            for y in range(grid_size + 1)
+            for x in range(grid_size + 1)
+        )
+        row = grid_size + 1
+        faces.extend(
+            (offset + y * row + x, offset + y * row + x + 1,
+             offset + (y + 1) * row + x + 1, offset + (y + 1) * row + x)
+            for y in range(grid_size)
+            for x in range(grid_size)
+        )
+
+    mesh = bpy.data.meshes.new(name)
+    mesh.from_pydata(verts, [], faces)
+    mesh.materials.append(bpy.data.materials.new(name + '_A'))
+    mesh.materials.append(bpy.data.materials.new(name + '_B'))
+    for vertex in mesh.vertices:
+        vertex.select = False
+    for polygon in mesh.polygons:
+        polygon.material_index = polygon.index % 2
+        # select roughly a quarter of the faces, for SELECTED
+        polygon.select = polygon.index % 4 == 0
+        if polygon.select:
+            for vertex_index in polygon.vertices:
+                mesh.vertices[vertex_index].select = True
+    mesh.update()
+    return mesh
+
+
+def build_scene(params):
+    """Builds a fresh scene for the given parameters.
+
+    :return: one object per mesh, to select or edit
+    """
+    bpy.ops.wm.read_homefile(use_empty=True)
+    scene = bpy.context.scene
+
+    initial_objects = []
+    for mesh_index in range(params['meshes']):
+        mesh = build_mesh('BenchMesh', params['grid_size'], params['parts'])
+        for instance_index in range(params['instances']):
+            parent = None
+            for depth in range(params['parent_depth']):
+                empty = bpy.data.objects.new('BenchParent', None)
+                empty.parent = parent
+                empty.location = (0, 0, 1) if depth else (mesh_index * 100, instance_index * 10, 0)
+                scene.collection.objects.link(empty)
+                parent = empty
+
+            obj = bpy.data.objects.new('BenchObject', mesh)
+            obj.parent = parent
+            if parent is None:
+                obj.location = (mesh_index * 100, instance_index * 10, 0)
+            obj.rotation_euler.z = instance_index * 0.1
+            scene.collection.objects.link(obj)
+
+            if instance_index == 0:
+                initial_objects.append(obj)
+
+    bpy.context.view_layer.update()
+    return initial_objects
+
+
+def time_operator(operator, **kwargs):
+    """Runs an operator and measures it.
+
+    :return: dictionary of seconds, objects created and peak mesh data-blocks
+    """
+    object_count, mesh_count = len(bpy.data.objects), len(bpy.data.meshes)
+    start = time.perf_counter()
+    operator(**kwargs)
+    seconds = time.perf_counter() - start
+    return {
+        'seconds': seconds,
+        'objects_created': len(bpy.data.objects) - object_count,
+        'peak_mesh_datablocks': max(mesh_count, len(bpy.data.meshes)),
+    }
+
+
+def run_separate(params, separate_type):
+    context = bpy.context
+    initial_objects = build_scene(params)
+    initial_obj = initial_objects[0]
+
+    bpy.ops.object.select_all(action='DESELECT')
+    initial_obj.select_set(True)
+    context.view_layer.objects.active = initial_obj
+    bpy.ops.object.editmode_toggle()
+    if separate_type != 'SELECTED':
+        bpy.ops.mesh.select_all(action='SELECT')
+
+    return time_operator(bpy.ops.mesh.separate_with_instances, type=separate_type, faces_per_chunk=FACES_PER_CHUNK)
+
+
+def decorate(objects):
+    """Gives objects the payloads of a rigged, animated prop: modifiers, a constraint, properties and animation."""
+    action = bpy.data.actions.new('BenchAction')
+    for obj in objects:
+        obj.modifiers.new('Bevel', 'BEVEL')
+        obj.modifiers.new('Weld', 'WELD')
+        obj.constraints.new('LIMIT_ROTATION')
+        obj['asset_id'] = 1
+        obj.animation_data_create().action = action
+        driver = obj.driver_add('rotation_euler', 2).driver
+        driver.expression = 'frame * 0.01'
+    return action
+
+
+def run_duplication(params, duplication):
+    """Separates decorated instances with full or lean copies.
+
+    Also records the time per created object, and the time to play back a few frames afterwards.
+    """
+    context = bpy.context
+    initial_objects = build_scene(params)
+    initial_obj = initial_objects[0]
+    decorate([obj for obj in context.scene.objects if obj.type == 'MESH'])
+
+    bpy.ops.object.select_all(action='DESELECT')
+    initial_obj.select_set(True)
+    context.view_layer.objects.active = initial_obj
+    bpy.ops.object.editmode_toggle()
+    bpy.ops.mesh.select_all(action='SELECT')
+
+    result = time_operator(bpy.ops.mesh.separate_with_instances, type='LOOSE', duplication=duplication)
+    result['seconds_per_object'] = result['seconds'] / max(1, result['objects_created'])
+
+    bpy.ops.object.mode_set(mode='OBJECT')
+    start = time.perf_counter()
+    for frame in range(1, PLAYBACK_FRAMES + 1):
+        context.scene.frame_set(frame)
+    result['playback_seconds'] = time.perf_counter() - start
+    return result
+
+
+def run_origin_set(params, origin_type, center):
+    context = bpy.context
+    initial_objects = build_scene(params)
+
+    bpy.ops.object.select_all(action='DESELECT')
+    for obj in initial_objects:
+        obj.select_set(True)
+    context.view_layer.objects.active = initial_objects[0]
+    context.scene.cursor.location = (1, 2, 3)
+
+    return time_operator(bpy.ops.object.origin_set_with_instances, type=origin_type, center=center)
+
+
+def iter_cases(sweeps):
+    """Yields (name, params) for the default scene, then each parameter sweep."""
+    yield 'default', dict(DEFAULT_PARAMS)
+    for key, values in sweeps.items():
+        for value in values:
+            params = dict(DEFAULT_PARAMS)
+            params[key] = value
+            yield '{}={}'.format(key, value), params
+
+
+def run_benchmarks(sweeps):
+    results = {}
+    for case_name, params in iter_cases(sweeps):
+        for separate_type in SEPARATE_TYPES:
+            key = 'separate[{}] {}'.format(separate_type, case_name)
+            results[key] = dict(params=params, **run_separate(params, separate_type))
+            print('{:<60} {:8.3f}s'.format(key, results[key]['seconds']))
+
+        for duplication in DUPLICATIONS:
+            key = 'separate_duplication[{}] {}'.format(duplication, case_name)
+            results[key] = dict(params=params, **run_duplication(params, duplication))
+            print('{:<60} {:8.3f}s {:8.1f}us/object'.format(key, results[key]['seconds'],
+                                                             results[key]['seconds_per_object'] * 1e6))
+
+        for origin_type in ORIGIN_TYPES:
+            for center in ORIGIN_CENTERS:
+                key = 'origin_set[{}, {}] {}'.format(origin_type, center, case_name)
+                results[key] = dict(params=params, **run_origin_set(params, origin_type, center))
+                print('{:<60} {:8.3f}s'.format(key, results[key]['seconds']))
+    return results
+
+
+def find_regressions(results, baseline, tolerance, min_seconds):
+    """Gets the cases that are slower than the baseline by more than ``tolerance``.
+
+    Cases faster than ``min_seconds`` are too noisy to compare.
+    """
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        limit = max(previous['seconds'] * (1.0 + tolerance), min_seconds)
+        if result['seconds'] > limit:
+            regressions.append((key, previous['seconds'], result['seconds']))
+    return regressions
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else sys.argv[1:]
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='compare against results stored in this JSON file')
+    parser.add_argument('--update-baseline', action='store_true', help='overwrite the baseline with these results')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown, as a fraction')
+    parser.add_argument('--min-seconds', type=float, default=0.05, help='ignore slowdowns below this time')
+    parser.add_argument('--quick', action='store_true', help='run a smaller sweep')
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    install_addon()
+
+    results = run_benchmarks(QUICK_SWEEPS if args.quick else SWEEPS)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        if args.update_baseline or not os.path.exists(args.baseline):
+            with open(args.baseline, 'w') as f:
+                json.dump(results, f, indent=2)
+            print('Stored baseline: {}'.format(args.baseline))
+            return 0
+
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.tolerance, args.min_seconds)
+        for key, previous, current in regressions:
+            print('REGRESSION {}: {:.3f}s -> {:.3f}s'.format(key, previous, current))
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,42 @@
+"""Tests for the spatial chunk kernels, which run without Blender."""
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+
+spec = importlib.util.spec_from_file_location('chunking', Path(__file__).parent.parent / 'chunking.py')
+chunking = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(chunking)
+
+
+def test_grid_labels_flat_layout():
+    # a 10 x 10 layout on the ground, split into about 4 cells
+    x, y = np.meshgrid(np.arange(10), np.arange(10))
+    points = np.stack((x.ravel(), y.ravel(), np.zeros(100)), axis=1)
+    labels = chunking.grid_labels(points, 4)
+    assert labels.max() + 1 == 4
+    assert np.array_equal(np.bincount(labels), [25, 25, 25, 25])
+
+
+def test_grid_labels_thin_axis():
+    # a long strip, slightly bumpy, split along its length
+    x, y = np.meshgrid(np.arange(73), np.arange(9))
+    points = np.stack((x.ravel(), y.ravel(), (x * y).ravel() % 3 * 0.1), axis=1)
+    labels = chunking.grid_labels(points, 4)
+    assert labels.max() + 1 <= 8
+
+
+def test_kmeans_labels_separates_clusters():
+    rng = np.random.default_rng(1)
+    centers = np.array([(0, 0, 0), (50, 0, 0), (0, 50, 0)])
+    points = np.concatenate([center + rng.normal(size=(200, 3)) for center in centers])
+    labels = chunking.kmeans_labels(points, 3)
+    # every cluster gets one label of its own
+    assert len({tuple(np.unique(labels[i * 200:(i + 1) * 200])) for i in range(3)}) == 3
+    assert all(len(np.unique(labels[i * 200:(i + 1) * 200])) == 1 for i in range(3))
+
+
+def test_single_chunk():
+    points = np.zeros((5, 3))
+    for method in ('GRID', 'KMEANS'):
+        assert not chunking.chunk_labels(points, method, 3).any()
@@ -0,0 +1,74 @@
+"""Tests for the origin kernels, which run without Blender."""
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+spec = importlib.util.spec_from_file_location('origin_kernels', Path(__file__).parent.parent / 'origin_kernels.py')
+origin_kernels = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(origin_kernels)
+
+
+def box(minimum, maximum):
+    """(co, corner_verts, face_starts, face_totals) of an axis-aligned box, with outward faces."""
+    (x0, y0, z0), (x1, y1, z1) = minimum, maximum
+    co = np.array([
+        (x0, y0, z0), (x1, y0, z0), (x1, y1, z0), (x0, y1, z0),
+        (x0, y0, z1), (x1, y0, z1), (x1, y1, z1), (x0, y1, z1),
+    ], dtype=np.float32)
+    faces = [(0, 3, 2, 1), (4, 5, 6, 7), (0, 1, 5, 4), (1, 2, 6, 5), (2, 3, 7, 6), (3, 0, 4, 7)]
+    corner_verts = np.array(faces, dtype=np.int32).ravel()
+    face_totals = np.full(len(faces), 4, dtype=np.int32)
+    face_starts = np.arange(len(faces), dtype=np.int32) * 4
+    return co, corner_verts, face_starts, face_totals
+
+
+def test_box_centers():
+    arrays = box((0, 0, 0), (2, 4, 6))
+    for origin_type in ('ORIGIN_CENTER_OF_MASS', 'ORIGIN_CENTER_OF_VOLUME'):
+        assert np.allclose(origin_kernels.origin_center(origin_type, 'MEDIAN', *arrays), (1, 2, 3))
+    assert np.allclose(origin_kernels.origin_center('ORIGIN_GEOMETRY', 'BOUNDS', *arrays), (1, 2, 3))
+
+
+def test_median_and_bounds_differ():
+    co = np.array([(0, 0, 0), (1, 0, 0), (4, 0, 0)], dtype=np.float32)
+    assert np.allclose(origin_kernels.median_center(co), (5 / 3, 0, 0))
+    assert np.allclose(origin_kernels.bounds_center(co), (2, 0, 0))
+
+
+def test_surface_center_weights_by_area():
+    # a big and a small square, side by side
+    co = np.array([
+        (0, 0, 0), (2, 0, 0), (2, 2, 0), (0, 2, 0),
+        (3, 0, 0), (4, 0, 0), (4, 1, 0), (3, 1, 0),
+    ], dtype=np.float32)
+    corner_verts = np.arange(8, dtype=np.int32)
+    center = origin_kernels.surface_center(co, corner_verts, np.array([0, 4]), np.array([4, 4]))
+    assert np.allclose(center, ((1 * 4 + 3.5 * 1) / 5, (1 * 4 + 0.5 * 1) / 5, 0))
+
+
+def test_concave_face_surface_center():
+    # L-shaped hexagon, fan triangulated from a reflex corner
+    co = np.array([(1, 1, 0), (0, 1, 0), (0, 2, 0), (2, 2, 0), (2, 0, 0), (1, 0, 0)], dtype=np.float32)
+    center = origin_kernels.surface_center(co, np.arange(6, dtype=np.int32), np.array([0]), np.array([6]))
+    # two 1x1 squares and one at (0.5, 1.5), (1.5, 1.5), (1.5, 0.5)
+    assert np.allclose(center, (7 / 6, 7 / 6, 0))
+
+
+def test_degenerate_meshes_fall_back_to_median():
+    co = np.array([(0, 0, 0), (1, 0, 0), (2, 0, 0)], dtype=np.float32)
+    arrays = co, np.arange(3, dtype=np.int32), np.array([0]), np.array([3])
+    assert np.allclose(origin_kernels.surface_center(*arrays), (1, 0, 0))
+    assert np.allclose(origin_kernels.volume_center(*arrays), (1, 0, 0))
+
+
+def test_unsupported_origin_type():
+    with pytest.raises(ValueError):
+        origin_kernels.origin_center('ORIGIN_CURSOR', 'MEDIAN', *box((0, 0, 0), (1, 1, 1)))
+
+
+def test_origin_centers_thread_pool():
+    meshes = [box((i, 0, 0), (i + 2, 2, 2)) for i in range(origin_kernels.PARALLEL_THRESHOLD * 2)]
+    centers = origin_kernels.origin_centers('ORIGIN_CENTER_OF_VOLUME', 'MEDIAN', meshes, max_workers=4)
+    assert np.allclose(centers, [(i + 1, 1, 1) for i in range(len(meshes))])
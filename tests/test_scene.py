@@ -1,11 +1,15 @@
 import ast
 import math
 import os
+import sys
+import time
 from pathlib import Path
+import numpy as np
 import pytest
 
 import bpy
 import addon_utils
+from mathutils import Matrix, Vector
 
 
 def test_math_isclose(a, b):
@@ -150,6 +154,39 @@ def test_separate_instance_loose_parts(context, ops):
     assert len({str(obj.location) for obj in context.scene.objects}) == 3
 
 
+def test_separate_multi_object_edit_mode(context, ops):
+    # clear scene
+    ops.wm.read_homefile()
+    ops.object.select_all(action='SELECT')
+    ops.object.delete(use_global=False, confirm=False)
+
+    # two cubes joined into one mesh, and Suzanne, each instanced twice
+    ops.mesh.primitive_cube_add()
+    ops.mesh.primitive_cube_add(location=(3, 0, 0))
+    ops.object.select_all(action='SELECT')
+    ops.object.join()
+    cubes = context.object
+    ops.object.duplicate_move_linked(OBJECT_OT_duplicate={"linked": True, "mode": 'TRANSLATION'},
+                                     TRANSFORM_OT_translate={"value": (0, 6, 0)})
+    ops.mesh.primitive_monkey_add(location=(0, -6, 0))
+    suzanne = context.object
+    ops.object.duplicate_move_linked(OBJECT_OT_duplicate={"linked": True, "mode": 'TRANSLATION'},
+                                     TRANSFORM_OT_translate={"value": (0, -6, 0)})
+
+    ops.object.select_all(action='DESELECT')
+    cubes.select_set(True)
+    suzanne.select_set(True)
+    context.view_layer.objects.active = suzanne
+    ops.object.editmode_toggle()
+    ops.mesh.select_all(action='SELECT')
+    ops.mesh.separate_with_instances(type='LOOSE')
+
+    # (3 Suzanne pieces + 2 cubes) * 2 instances
+    assert len(context.scene.objects) == 10
+    assert len({obj.data for obj in context.scene.objects}) == 5
+    assert set(context.objects_in_mode) == {cubes, suzanne}
+
+
 def test_separate_instance_selected(context, ops):
     # clear scene
     ops.object.select_all(action='SELECT')
@@ -227,6 +264,359 @@ def test_separate_instance_material(context, ops):
     assert len({str(obj.location) for obj in context.scene.objects}) == 3
 
 
+def test_separate_instance_collections(context, ops):
+    # clear scene
+    ops.object.select_all(action='SELECT')
+    ops.object.delete(use_global=False, confirm=False)
+
+    ops.mesh.primitive_monkey_add()
+    ops.object.duplicate_move_linked(OBJECT_OT_duplicate={"linked": True, "mode": 'TRANSLATION'},
+                                     TRANSFORM_OT_translate={"value": (5, 0, 0)})
+
+    # move the instance to its own collection
+    instance_collection = bpy.data.collections.new('Instances')
+    context.scene.collection.children.link(instance_collection)
+    instance = context.scene.objects['Suzanne.001']
+    for collection in instance.users_collection:
+        collection.objects.unlink(instance)
+    instance_collection.objects.link(instance)
+
+    ops.object.select_all(action='DESELECT')
+    context.view_layer.objects.active = context.scene.objects['Suzanne']
+    ops.object.editmode_toggle()
+    ops.mesh.select_all(action='SELECT')
+    ops.mesh.separate_with_instances(type='LOOSE')
+
+    # (two eyes + head) * 2 == 6 meshes
+    assert len(context.scene.objects) == 6
+
+    # pieces placed on the instance go to the instance's collection
+    assert len(instance_collection.objects) == 3
+    assert len({str(obj.matrix_world.to_translation()) for obj in instance_collection.objects}) == 1
+    assert test_math_isclose(instance_collection.objects[0].matrix_world.to_translation().x, 5)
+
+
+def test_separate_collection_instances(context, ops):
+    # clear scene
+    ops.object.select_all(action='SELECT')
+    ops.object.delete(use_global=False, confirm=False)
+
+    ops.mesh.primitive_monkey_add()
+    ops.object.duplicate_move_linked(OBJECT_OT_duplicate={"linked": True, "mode": 'TRANSLATION'},
+                                     TRANSFORM_OT_translate={"value": (-2.97763, -5.86426, 0)})
+    ops.object.duplicate_move_linked(OBJECT_OT_duplicate={"linked": True, "mode": 'TRANSLATION'},
+                                     TRANSFORM_OT_translate={"value": (5.13482, 12.2365, 0)})
+
+    ops.object.editmode_toggle()
+    ops.mesh.select_all(action='SELECT')
+    ops.mesh.separate_with_instances(type='LOOSE', output='COLLECTION_INSTANCES')
+
+    collection_instances = [obj for obj in context.scene.objects if obj.instance_type == 'COLLECTION']
+    assert len(collection_instances) == 3
+    assert len({str(obj.location) for obj in collection_instances}) == 3
+
+    # (two eyes + head) + 3 collection instances == 6 objects, instead of 9
+    collection = collection_instances[0].instance_collection
+    assert all(obj.instance_collection == collection for obj in collection_instances)
+    assert len(collection.objects) == 3
+    assert len(context.scene.objects) == 6
+
+    # pieces sit at the collection origin
+    assert all(obj.matrix_world == Matrix.Identity(4) for obj in collection.objects)
+
+
+def test_separate_collection_instances_view_layers(context, ops):
+    # clear scene
+    ops.object.select_all(action='SELECT')
+    ops.object.delete(use_global=False, confirm=False)
+
+    second = context.scene.view_layers.new('Second')
+    ops.mesh.primitive_monkey_add()
+    ops.object.duplicate_move_linked(OBJECT_OT_duplicate={"linked": True, "mode": 'TRANSLATION'},
+                                     TRANSFORM_OT_translate={"value": (3, 0, 0)})
+    ops.object.editmode_toggle()
+    ops.mesh.select_all(action='SELECT')
+    ops.mesh.separate_with_instances(type='LOOSE', output='COLLECTION_INSTANCES')
+
+    # the pieces only show through the collection instances, in every view layer
+    for view_layer in context.scene.view_layers:
+        assert {obj.instance_type for obj in view_layer.objects} == {'COLLECTION'}
+    assert len(second.objects) == 2
+
+
+def separate_mesh_stats(context, ops, separate_type, backend, loose_geometry=False):
+    """Separates three Suzanne instances and gets the (vertex, edge, face, corner) counts of every resulting mesh.
+
+    :param loose_geometry: add a loose edge and a loose vertex, and start with the first material
+    """
+    # clear scene
+    ops.wm.read_homefile()
+    ops.object.select_all(action='SELECT')
+    ops.object.delete(use_global=False, confirm=False)
+
+    ops.mesh.primitive_monkey_add()
+    mesh = context.object.data
+    mesh.materials.append(bpy.data.materials.new(name='test_material_a'))
+    mesh.materials.append(bpy.data.materials.new(name='test_material_b'))
+    for polygon in mesh.polygons:
+        polygon.material_index = (polygon.index % 3 == 0) != loose_geometry
+    if loose_geometry:
+        vertex_count = len(mesh.vertices)
+        mesh.vertices.add(3)
+        for i, vertex in enumerate(mesh.vertices[vertex_count:]):
+            vertex.co = (5 + i, 0, 0)
+        mesh.edges.add(1)
+        mesh.edges[-1].vertices = (vertex_count, vertex_count + 1)
+        mesh.update()
+    ops.object.duplicate_move_linked(OBJECT_OT_duplicate={"linked": True, "mode": 'TRANSLATION'},
+                                     TRANSFORM_OT_translate={"value": (-2.97763, -5.86426, 0)})
+    ops.object.duplicate_move_linked(OBJECT_OT_duplicate={"linked": True, "mode": 'TRANSLATION'},
+                                     TRANSFORM_OT_translate={"value": (5.13482, 12.2365, 0)})
+
+    ops.object.editmode_toggle()
+    if separate_type == 'SELECTED':
+        ops.mesh.select_all(action='DESELECT')
+        ops.mesh.select_random(ratio=0.25, seed=1)
+    else:
+        ops.mesh.select_all(action='SELECT')
+    ops.mesh.separate_with_instances(type=separate_type, backend=backend)
+    ops.object.editmode_toggle()
+
+    assert len({str(obj.location) for obj in context.scene.objects}) == 3
+    meshes = {obj.data for obj in context.scene.objects}
+    assert all(mesh.uv_layers.active is not None for mesh in meshes if len(mesh.polygons))
+    return len(context.scene.objects), sorted(
+        (len(mesh.vertices), len(mesh.edges), len(mesh.polygons), len(mesh.loops),
+         tuple(material.name for material in mesh.materials))
+        for mesh in meshes
+    )
+
+
+@pytest.mark.parametrize('separate_type, loose_geometry', [
+    ('SELECTED', False), ('MATERIAL', False), ('MATERIAL', True), ('LOOSE', False),
+])
+def test_separate_numpy_backend(context, ops, separate_type, loose_geometry):
+    expected = separate_mesh_stats(context, ops, separate_type, 'OPERATOR', loose_geometry)
+    assert separate_mesh_stats(context, ops, separate_type, 'NUMPY', loose_geometry) == expected
+
+
+def test_separate_numpy_custom_normals(context, ops):
+    # clear scene
+    ops.wm.read_homefile()
+    ops.object.select_all(action='SELECT')
+    ops.object.delete(use_global=False, confirm=False)
+
+    ops.mesh.primitive_monkey_add()
+    suzanne = context.object
+    suzanne.data.normals_split_custom_set([(0, 0, 1)] * len(suzanne.data.loops))
+    ops.object.duplicate_move_linked(OBJECT_OT_duplicate={"linked": True, "mode": 'TRANSLATION'},
+                                     TRANSFORM_OT_translate={"value": (3, 0, 0)})
+    ops.object.select_all(action='DESELECT')
+    suzanne.select_set(True)
+    context.view_layer.objects.active = suzanne
+    ops.object.editmode_toggle()
+    ops.mesh.select_all(action='SELECT')
+    ops.mesh.separate_with_instances(type='LOOSE', backend='NUMPY')
+    ops.object.editmode_toggle()
+
+    assert len(context.scene.objects) == 6
+    for mesh in {obj.data for obj in context.scene.objects}:
+        # older versions separate these meshes with Blender's operator, which keeps custom normals as well
+        assert mesh.has_custom_normals
+        normals = np.empty(len(mesh.loops) * 3)
+        mesh.corner_normals.foreach_get('vector', normals)
+        assert np.allclose(normals.reshape(-1, 3), (0, 0, 1), atol=1e-2)
+
+
+@pytest.mark.parametrize('chunk_method, use_vertex_groups', [('GRID', False), ('KMEANS', False), ('GRID', True)])
+def test_separate_chunks(context, ops, chunk_method, use_vertex_groups):
+    # clear scene
+    ops.wm.read_homefile()
+    ops.object.select_all(action='SELECT')
+    ops.object.delete(use_global=False, confirm=False)
+
+    # a 16 x 16 face grid, split into chunks of about 64 faces
+    ops.mesh.primitive_grid_add(x_subdivisions=16, y_subdivisions=16, size=8)
+    grid = context.object
+    if use_vertex_groups:
+        # separated with Blender's operator instead
+        grid.vertex_groups.new(name='Group')
+    ops.object.duplicate_move_linked(OBJECT_OT_duplicate={"linked": True, "mode": 'TRANSLATION'},
+                                     TRANSFORM_OT_translate={"value": (10, 0, 0)})
+    context.view_layer.objects.active = grid
+    ops.object.select_all(action='DESELECT')
+    grid.select_set(True)
+
+    ops.object.editmode_toggle()
+    ops.mesh.select_all(action='SELECT')
+    ops.mesh.separate_with_instances(type='CHUNKS', chunk_method=chunk_method, faces_per_chunk=64)
+    ops.object.editmode_toggle()
+
+    chunks = [obj for obj in context.scene.objects if obj.location.x == 0]
+    assert len(chunks) == 4
+    assert sum(len(obj.data.polygons) for obj in chunks) == 256
+    assert all('separate_with_instances_chunk' not in obj.data.attributes for obj in chunks)
+    # every chunk on the instance too, sharing its data
+    assert len(context.scene.objects) == 8
+    assert len({obj.data for obj in context.scene.objects}) == 4
+
+
+def test_separate_lean_copies(context, ops):
+    # clear scene
+    ops.wm.read_homefile()
+    ops.object.select_all(action='SELECT')
+    ops.object.delete(use_global=False, confirm=False)
+
+    ops.mesh.primitive_monkey_add()
+    suzanne = context.object
+    ops.object.duplicate_move_linked(OBJECT_OT_duplicate={"linked": True, "mode": 'TRANSLATION'},
+                                     TRANSFORM_OT_translate={"value": (3, 0, 0)})
+    instance = context.object
+    modifier = instance.modifiers.new('Bevel', 'BEVEL')
+    modifier.width = 0.25
+    instance.constraints.new('COPY_ROTATION')
+    instance['asset_id'] = 7
+    suzanne['asset_id'] = 3
+
+    context.view_layer.objects.active = suzanne
+    ops.object.select_all(action='DESELECT')
+    suzanne.select_set(True)
+    ops.object.editmode_toggle()
+    ops.mesh.select_all(action='SELECT')
+    ops.mesh.separate_with_instances(type='LOOSE', duplication='LEAN', lean_extras={'MODIFIERS'})
+
+    copies = [obj for obj in context.scene.objects if obj.data not in (suzanne.data,) and obj.location.x == 3]
+    assert len(copies) == 2
+    for copy in copies:
+        assert [(m.type, m.width) for m in copy.modifiers] == [('BEVEL', 0.25)]
+        assert len(copy.constraints) == 0
+        assert 'asset_id' not in copy.keys()
+
+
+@pytest.mark.parametrize('use_vertex_groups', [False, True])
+def test_join_with_instances(context, ops, use_vertex_groups):
+    # clear scene
+    ops.wm.read_homefile()
+    ops.object.select_all(action='SELECT')
+    ops.object.delete(use_global=False, confirm=False)
+
+    ops.mesh.primitive_monkey_add()
+    suzanne = context.object
+    if use_vertex_groups:
+        # joined with Blender's operator instead
+        suzanne.vertex_groups.new(name='Group')
+    for location, rotation, scale in (((4, 0, 0), (0, 0, 0), 1), ((0, 5, 0), (0.3, 0, 1.2), 2), ((0, -5, 0), (0, 0, 0), 1)):
+        instance = bpy.data.objects.new('Suzanne', suzanne.data)
+        instance.location = location
+        instance.rotation_euler = rotation
+        instance.scale = (scale,) * 3
+        context.scene.collection.objects.link(instance)
+
+    ops.object.editmode_toggle()
+    ops.mesh.select_all(action='SELECT')
+    ops.mesh.separate_with_instances(type='LOOSE')
+    ops.object.editmode_toggle()
+    assert len(context.scene.objects) == 12
+
+    # one instance loses an eye, so it cannot be joined
+    lone_eye = next(obj for obj in context.scene.objects
+                    if obj.data != suzanne.data and obj.matrix_world.translation.y == -5)
+    bpy.data.objects.remove(next(obj for obj in context.scene.objects
+                                 if obj.data != suzanne.data and obj.matrix_world.translation.y == -5
+                                 and obj != lone_eye))
+    context.view_layer.update()
+
+    def world_vertices():
+        return np.array(sorted(
+            tuple(obj.matrix_world @ vertex.co) for obj in context.scene.objects for vertex in obj.data.vertices
+        ))
+
+    expected = world_vertices()
+
+    ops.object.select_all(action='DESELECT')
+    for obj in context.scene.objects:
+        if obj.data != suzanne.data and obj.matrix_world == suzanne.matrix_world:
+            obj.select_set(True)
+    suzanne.select_set(True)
+    context.view_layer.objects.active = suzanne
+    ops.object.join_with_instances()
+
+    # three joined heads, and the instance missing an eye with its head and remaining eye
+    assert len(context.scene.objects) == 5
+    joined = [obj for obj in context.scene.objects if obj.data == suzanne.data]
+    assert len(joined) == 3
+    assert len(suzanne.data.vertices) == 507
+    assert lone_eye.name in context.scene.objects
+    assert np.abs(world_vertices() - expected).max() < 1e-4
+
+
+def test_separate_deduplicate(context, ops):
+    # clear scene
+    ops.wm.read_homefile()
+    ops.object.select_all(action='SELECT')
+    ops.object.delete(use_global=False, confirm=False)
+
+    # three loose cubes, the last two moved and rotated copies of the first
+    ops.mesh.primitive_cube_add()
+    ops.mesh.primitive_cube_add(location=(4, 0, 0), rotation=(0.3, 0, 0.5))
+    ops.mesh.primitive_cube_add(location=(0, 5, 1), rotation=(0, 1.2, 0))
+    ops.object.select_all(action='SELECT')
+    ops.object.join()
+    ops.object.duplicate_move_linked(OBJECT_OT_duplicate={"linked": True, "mode": 'TRANSLATION'},
+                                     TRANSFORM_OT_translate={"value": (10, 0, 0)})
+
+    def world_vertices():
+        return np.array([
+            obj.matrix_world @ vertex.co for obj in context.scene.objects for vertex in obj.data.vertices
+        ])
+
+    expected = world_vertices()
+
+    ops.object.editmode_toggle()
+    ops.mesh.select_all(action='SELECT')
+    ops.mesh.separate_with_instances(type='LOOSE', deduplicate=True)
+    ops.object.editmode_toggle()
+
+    assert len(context.scene.objects) == 6
+    # the initial mesh, and one mesh shared by both separated cubes
+    assert len({obj.data for obj in context.scene.objects}) == 2
+    # every vertex is still in place
+    distances = np.linalg.norm(world_vertices()[:, None] - expected[None], axis=-1)
+    assert distances.min(axis=1).max() < 1e-4
+    assert distances.min(axis=0).max() < 1e-4
+
+
+def test_separate_through_collection_instances(context, ops):
+    # clear scene
+    ops.wm.read_homefile()
+    ops.object.select_all(action='SELECT')
+    ops.object.delete(use_global=False, confirm=False)
+
+    ops.mesh.primitive_monkey_add()
+    suzanne = context.object
+
+    # another Suzanne instance, only reachable through a collection instanced many times
+    kit = bpy.data.collections.new('Kit')
+    kit_suzanne = bpy.data.objects.new('Kit Suzanne', suzanne.data)
+    kit_suzanne.location = (0, 3, 0)
+    kit.objects.link(kit_suzanne)
+    for i in range(100):
+        empty = bpy.data.objects.new('Kit Instance', None)
+        empty.instance_type = 'COLLECTION'
+        empty.instance_collection = kit
+        empty.location = (i * 5, 0, 0)
+        context.scene.collection.objects.link(empty)
+
+    ops.object.editmode_toggle()
+    ops.mesh.select_all(action='SELECT')
+    ops.mesh.separate_with_instances(type='LOOSE', through_collection_instances=True)
+
+    # two eyes copied once into the collection, not once per collection instance
+    assert len(kit.objects) == 3
+    assert len(context.scene.objects) == 103
+    assert {obj.matrix_world.translation.y for obj in kit.objects} == {3}
+
+
 def test_set_origin_shifted(context, ops, origin_type, center):
     # clear scene
     ops.object.select_all(action='SELECT')
@@ -255,6 +645,569 @@ def test_set_origin_shifted(context, ops, origin_type, center):
     assert test_math_isclose(loc0[2], loc1[2]) and test_math_isclose(loc1[2], loc2[2])
 
 
+@pytest.mark.parametrize('origin_type', ['ORIGIN_GEOMETRY', 'ORIGIN_CENTER_OF_MASS', 'ORIGIN_CENTER_OF_VOLUME'])
+def test_origin_kernels_match_origin_set(context, ops, origin_type, center):
+    from separate_with_instances.origin_kernels import origin_center
+    from separate_with_instances.separation import mesh_geometry
+
+    # clear scene
+    ops.object.select_all(action='SELECT')
+    ops.object.delete(use_global=False, confirm=False)
+
+    ops.mesh.primitive_monkey_add(location=(1, 2, 3), rotation=(0.2, 0.4, 0.6), scale=(1, 2, 3))
+    obj = context.object
+    expected = obj.matrix_world @ Vector(origin_center(origin_type, center, *mesh_geometry(obj.data)))
+
+    ops.object.origin_set(type=origin_type, center=center)
+    context.view_layer.update()
+    assert (obj.matrix_world.translation - expected).length < 1e-4
+
+
+def test_set_origin_selected_instances(context, ops, origin_type, center):
+    # clear scene
+    ops.object.select_all(action='SELECT')
+    ops.object.delete(use_global=False, confirm=False)
+
+    ops.mesh.primitive_monkey_add()
+
+    DISTANCE = 5.0
+    ops.object.duplicate_move_linked(OBJECT_OT_duplicate={"linked": True, "mode": 'TRANSLATION'},
+                                     TRANSFORM_OT_translate={"value": (DISTANCE, 0, 0)})
+    mesh_count = len(bpy.data.meshes)
+
+    # every instance selected, so the shared mesh must still only be processed once
+    ops.object.select_all(action='SELECT')
+    ops.object.origin_set_with_instances(type=origin_type, center=center)
+
+    objects = context.scene.objects
+    assert len(bpy.data.meshes) == mesh_count
+    assert len({obj.data for obj in objects}) == 1
+    loc0, loc1 = objects['Suzanne'].location, objects['Suzanne.001'].location
+    assert test_math_isclose(loc0[0] + DISTANCE, loc1[0])
+    assert test_math_isclose(loc0[1], loc1[1]) and test_math_isclose(loc0[2], loc1[2])
+
+
+@pytest.mark.parametrize('scope, moved', [
+    ('SCENE', {'Excluded', 'Prop', 'Hidden'}),
+    ('VIEW_LAYER', {'Prop', 'Hidden'}),
+    ('COLLECTION', {'Prop', 'Hidden'}),
+    ('VISIBLE', {'Prop'}),
+])
+def test_set_origin_scope(context, ops, scope, moved):
+    # clear scene
+    ops.object.select_all(action='SELECT')
+    ops.object.delete(use_global=False, confirm=False)
+
+    ops.mesh.primitive_monkey_add()
+    suzanne = context.object
+
+    layout = bpy.data.collections.new('Layout')
+    props = bpy.data.collections.new('Props')
+    for collection in (layout, props):
+        context.scene.collection.children.link(collection)
+    context.view_layer.layer_collection.children['Layout'].exclude = True
+    for name, collection in (('Excluded', layout), ('Prop', props), ('Hidden', props)):
+        instance = bpy.data.objects.new(name, suzanne.data)
+        collection.objects.link(instance)
+    context.scene.objects['Hidden'].hide_set(True)
+
+    context.scene.cursor.location = (1, 0, 0)
+    ops.object.select_all(action='DESELECT')
+    suzanne.select_set(True)
+    context.view_layer.objects.active = suzanne
+    ops.object.origin_set_with_instances(type='ORIGIN_CURSOR', scope=scope, collection='Props')
+
+    assert {name for name in ('Excluded', 'Prop', 'Hidden')
+            if context.scene.objects[name].location.x == pytest.approx(1)} == moved
+
+
+def test_set_origin_parented_instances(context, ops):
+    # clear scene
+    ops.object.select_all(action='SELECT')
+    ops.object.delete(use_global=False, confirm=False)
+
+    ops.mesh.primitive_monkey_add()
+    ops.object.duplicate_move_linked(OBJECT_OT_duplicate={"linked": True, "mode": 'TRANSLATION'},
+                                     TRANSFORM_OT_translate={"value": (5, 0, 0)})
+
+    # instance parented to another instance of the same mesh
+    parent, child = context.scene.objects['Suzanne'], context.scene.objects['Suzanne.001']
+    child.parent = parent
+    child.matrix_parent_inverse = parent.matrix_world.inverted()
+    context.view_layer.update()
+    child_vertex_world = child.matrix_world @ child.data.vertices[0].co
+
+    ops.object.select_all(action='DESELECT')
+    parent.select_set(True)
+    context.view_layer.objects.active = parent
+    context.scene.cursor.location = (1, 2, 3)
+    ops.object.origin_set_with_instances(type='ORIGIN_CURSOR')
+
+    assert test_math_isclose((parent.matrix_world.to_translation() - Vector((1, 2, 3))).length, 0)
+    assert test_math_isclose((child.matrix_world.to_translation() - Vector((6, 2, 3))).length, 0)
+
+    # the geometry itself did not move
+    assert test_math_isclose((child.matrix_world @ child.data.vertices[0].co - child_vertex_world).length, 0)
+
+
+def test_set_origin_instance_children(context, ops):
+    # clear scene
+    ops.object.select_all(action='SELECT')
+    ops.object.delete(use_global=False, confirm=False)
+
+    ops.mesh.primitive_monkey_add()
+    suzanne = context.object
+    ops.object.duplicate_move_linked(OBJECT_OT_duplicate={"linked": True, "mode": 'TRANSLATION'},
+                                     TRANSFORM_OT_translate={"value": (5, 0, 0)})
+    instance = context.object
+
+    # an empty parented to the other instance, which is not an instance itself
+    empty = bpy.data.objects.new('Empty', None)
+    context.scene.collection.objects.link(empty)
+    empty.location = (5, 0, 2)
+    empty.parent = instance
+    empty.matrix_parent_inverse = instance.matrix_world.inverted()
+    context.view_layer.update()
+
+    ops.object.select_all(action='DESELECT')
+    suzanne.select_set(True)
+    context.view_layer.objects.active = suzanne
+    context.scene.cursor.location = (1, 1, 1)
+    ops.object.origin_set_with_instances(type='ORIGIN_CURSOR')
+
+    assert test_math_isclose((instance.matrix_world.to_translation() - Vector((6, 1, 1))).length, 0)
+    assert test_math_isclose((empty.matrix_world.to_translation() - Vector((5, 0, 2))).length, 0)
+
+
+def test_api(context, ops):
+    from separate_with_instances import api
+
+    # clear scene
+    ops.object.select_all(action='SELECT')
+    ops.object.delete(use_global=False, confirm=False)
+
+    ops.mesh.primitive_monkey_add()
+    suzanne = context.object
+    ops.object.duplicate_move_linked(OBJECT_OT_duplicate={"linked": True, "mode": 'TRANSLATION'},
+                                     TRANSFORM_OT_translate={"value": (5, 0, 0)})
+    ops.mesh.primitive_cube_add(location=(0, 5, 0))
+    cube = context.object
+    ops.object.duplicate_move_linked(OBJECT_OT_duplicate={"linked": True, "mode": 'TRANSLATION'},
+                                     TRANSFORM_OT_translate={"value": (5, 0, 0)})
+
+    # works on the data-blocks, whatever the selection and mode
+    ops.object.select_all(action='DESELECT')
+
+    # an instance whose data was set by a script, without a depsgraph update since
+    api.find_sources(suzanne.data, context.scene, context.view_layer)
+    other = bpy.data.objects.new('Other', bpy.data.meshes.new('Other'))
+    context.scene.collection.objects.link(other)
+    context.view_layer.update()
+    other.data = suzanne.data
+
+    created = api.separate_with_instances(suzanne.data, 'LOOSE')
+    # two eyes, on all three instances
+    assert len(created) == 6
+    assert len(context.scene.objects) == 11
+
+    cube.data.transform(Matrix.Translation((1, 0, 0)))
+    changed = api.set_origin_with_instances([cube.data], 'ORIGIN_GEOMETRY')
+    assert len(changed) == 2
+    assert sorted(tuple(obj.location) for obj in changed) == pytest.approx([(1, 5, 0), (6, 5, 0)])
+
+    with pytest.raises(ValueError):
+        api.set_origin_with_instances(bpy.data.meshes.new('Unused'))
+
+    # meshes in edit mode are not current
+    context.view_layer.objects.active = cube
+    ops.object.editmode_toggle()
+    with pytest.raises(ValueError, match='edit mode'):
+        api.separate_with_instances(cube.data, 'LOOSE')
+    with pytest.raises(ValueError, match='edit mode'):
+        api.set_origin_with_instances(cube.data)
+
+
+def test_manifest_round_trip(context, ops, tmp_path):
+    from separate_with_instances.manifest import export_manifest, import_manifest
+
+    # clear scene
+    ops.object.select_all(action='SELECT')
+    ops.object.delete(use_global=False, confirm=False)
+
+    ops.mesh.primitive_monkey_add()
+    suzanne = context.object
+    props = bpy.data.collections.new('Props')
+    context.scene.collection.children.link(props)
+    for i in range(1, 4):
+        instance = bpy.data.objects.new('Suzanne Instance', suzanne.data)
+        instance.location = (i * 3, 0, 0)
+        instance.rotation_euler = (0, 0, i)
+        props.objects.link(instance)
+    # a child instance, placed relative to its parent
+    child = context.scene.objects['Suzanne Instance.001']
+    child.parent = context.scene.objects['Suzanne Instance']
+    child.matrix_parent_inverse = Matrix.Translation((0, 0, 2))
+    context.view_layer.update()
+
+    # objects outside the manifest keep their transform exactly, not just their matrix
+    mirrored = bpy.data.objects.new('Mirrored', None)
+    mirrored.rotation_euler = (0, 0, 7)
+    mirrored.scale = (-1, 1, 1)
+    axis_angle = bpy.data.objects.new('Axis Angle', None)
+    axis_angle.rotation_mode = 'AXIS_ANGLE'
+    axis_angle.rotation_axis_angle = (4, 0, 0, 1)
+    for empty in (mirrored, axis_angle):
+        context.scene.collection.objects.link(empty)
+    context.view_layer.update()
+
+    filepath = tmp_path / 'instances.npz'
+    arrays = export_manifest(filepath)
+    assert list(arrays['meshes']) == [suzanne.data.name]
+    assert list(arrays['offsets']) == [0, 4]
+    assert arrays['matrix_world'].shape == (4, 4, 4)
+    expected = {obj.name: obj.matrix_world.copy() for obj in context.scene.objects}
+
+    # moved and removed instances are put back
+    context.scene.objects['Suzanne Instance'].location = (0, 10, 0)
+    bpy.data.objects.remove(context.scene.objects['Suzanne Instance.002'])
+    created, updated = import_manifest(filepath)
+    context.view_layer.update()
+
+    assert [obj.name for obj in created] == ['Suzanne Instance.002']
+    assert len(updated) == 3
+    assert created[0].users_collection[0] == props
+    assert child.parent.name == 'Suzanne Instance'
+    for name, matrix in expected.items():
+        assert np.allclose(context.scene.objects[name].matrix_world, matrix, atol=1e-5)
+    assert tuple(mirrored.rotation_euler) == (0, 0, 7) and tuple(mirrored.scale) == (-1, 1, 1)
+    assert tuple(axis_angle.rotation_axis_angle) == (4, 0, 0, 1)
+
+
+def test_profiling_dump(context, ops, tmp_path):
+    import pstats
+
+    # clear scene
+    ops.object.select_all(action='SELECT')
+    ops.object.delete(use_global=False, confirm=False)
+
+    ops.mesh.primitive_monkey_add()
+    ops.object.duplicate_move_linked(OBJECT_OT_duplicate={"linked": True, "mode": 'TRANSLATION'},
+                                     TRANSFORM_OT_translate={"value": (5, 0, 0)})
+
+    preferences = context.preferences.addons['separate_with_instances'].preferences
+    dump_path = tmp_path / 'separate.prof'
+    preferences.use_profiling = True
+    preferences.profile_dump_path = str(dump_path)
+    try:
+        ops.object.editmode_toggle()
+        ops.mesh.select_all(action='SELECT')
+        # cancelled operators stop profiling too
+        ops.mesh.separate_with_instances(type='LOOSE', dry_run=True)
+        assert sys.getprofile() is None
+        ops.mesh.separate_with_instances(type='LOOSE')
+    finally:
+        preferences.use_profiling = False
+        preferences.profile_dump_path = ''
+
+    assert sys.getprofile() is None
+    assert len(context.scene.objects) == 6
+    assert pstats.Stats(str(dump_path)).total_calls > 0
+
+
+def test_batch_job():
+    from separate_with_instances.batching import BatchJob
+
+    ranges = []
+    job = BatchJob(10, lambda start, stop: ranges.append((start, stop)), batch_size=4)
+    assert not job.run_for(0)
+    job.run_all()
+
+    assert job.finished and job.done == 10
+    assert ranges == [(0, 4), (4, 8), (8, 10)]
+
+
+def test_separate_invoke_batched(context, ops):
+    # clear scene
+    ops.object.select_all(action='SELECT')
+    ops.object.delete(use_global=False, confirm=False)
+
+    ops.mesh.primitive_monkey_add()
+    for i in range(4):
+        ops.object.duplicate_move_linked(OBJECT_OT_duplicate={"linked": True, "mode": 'TRANSLATION'},
+                                         TRANSFORM_OT_translate={"value": (3, 0, 0)})
+
+    preferences = context.preferences.addons['separate_with_instances'].preferences
+    preferences.modal_threshold = 1
+    try:
+        ops.object.editmode_toggle()
+        ops.mesh.select_all(action='SELECT')
+        # without a window, batches run to completion instead of modally
+        ops.mesh.separate_with_instances('INVOKE_DEFAULT', type='LOOSE')
+    finally:
+        preferences.property_unset('modal_threshold')
+
+    # (two eyes + head) * 5 == 15 meshes
+    assert len(context.scene.objects) == 15
+    assert len({obj.data for obj in context.scene.objects}) == 3
+    assert len({str(obj.location) for obj in context.scene.objects}) == 5
+
+
+@pytest.fixture
+def partial_rollback(monkeypatch):
+    """Makes batched operators run one batch of their job and then roll back, as if cancelled with Esc."""
+    from separate_with_instances.batching import ModalBatchMixin
+
+    def run(self, context, use_modal):
+        self.job.batch_size = 1
+        self.job.run_batch()
+        self.rollback(context)
+        return {'CANCELLED'}
+
+    monkeypatch.setattr(ModalBatchMixin, 'run', run)
+
+
+def test_separate_rollback(context, ops, partial_rollback):
+    # clear scene
+    ops.object.select_all(action='SELECT')
+    ops.object.delete(use_global=False, confirm=False)
+
+    ops.mesh.primitive_monkey_add()
+    suzanne = context.object
+    vertex_count = len(suzanne.data.vertices)
+    for i in range(3):
+        ops.object.duplicate_move_linked(OBJECT_OT_duplicate={"linked": True, "mode": 'TRANSLATION'},
+                                         TRANSFORM_OT_translate={"value": (3, 0, 0)})
+
+    ops.object.select_all(action='DESELECT')
+    suzanne.select_set(True)
+    context.view_layer.objects.active = suzanne
+    ops.object.editmode_toggle()
+    ops.mesh.select_all(action='SELECT')
+    ops.mesh.separate_with_instances(type='LOOSE')
+
+    assert context.object == suzanne and suzanne.mode == 'EDIT'
+    ops.object.editmode_toggle()
+    assert len(context.scene.objects) == 4
+    assert {obj.data for obj in context.scene.objects} == {suzanne.data}
+    assert len(suzanne.data.vertices) == vertex_count
+
+
+def test_separate_rollback_material_slots(context, ops, partial_rollback):
+    # clear scene
+    ops.object.select_all(action='SELECT')
+    ops.object.delete(use_global=False, confirm=False)
+
+    ops.mesh.primitive_monkey_add()
+    suzanne = context.object
+    mesh_name = suzanne.data.name
+    vertex_count = len(suzanne.data.vertices)
+    for name in 'abc':
+        suzanne.data.materials.append(bpy.data.materials.new(name))
+    suzanne.data.polygons.foreach_set('material_index', [i % 3 for i in range(len(suzanne.data.polygons))])
+    for i in range(3):
+        ops.object.duplicate_move_linked(OBJECT_OT_duplicate={"linked": True, "mode": 'TRANSLATION'},
+                                         TRANSFORM_OT_translate={"value": (3, 0, 0)})
+    # an object-linked material on one instance relies on the slot order
+    instance = context.object
+    instance.material_slots[1].link = 'OBJECT'
+    instance.material_slots[1].material = bpy.data.materials['c']
+
+    orphan_meshes = {mesh for mesh in bpy.data.meshes if mesh.users == 0}
+
+    ops.object.select_all(action='DESELECT')
+    suzanne.select_set(True)
+    context.view_layer.objects.active = suzanne
+    ops.object.editmode_toggle()
+    ops.mesh.select_all(action='SELECT')
+    ops.mesh.separate_with_instances(type='MATERIAL')
+
+    ops.object.editmode_toggle()
+    assert len(context.scene.objects) == 4
+    assert {obj.data for obj in context.scene.objects} == {suzanne.data}
+    assert suzanne.data.name == mesh_name
+    assert [material.name for material in suzanne.data.materials] == ['a', 'b', 'c']
+    assert instance.material_slots[1].material.name == 'c'
+    assert len(suzanne.data.vertices) == vertex_count
+    assert {mesh for mesh in bpy.data.meshes if mesh.users == 0} == orphan_meshes
+
+
+def test_set_origin_rollback(context, ops, partial_rollback):
+    # clear scene
+    ops.object.select_all(action='SELECT')
+    ops.object.delete(use_global=False, confirm=False)
+
+    ops.mesh.primitive_monkey_add()
+    suzanne = context.object
+    for i in range(3):
+        ops.object.duplicate_move_linked(OBJECT_OT_duplicate={"linked": True, "mode": 'TRANSLATION'},
+                                         TRANSFORM_OT_translate={"value": (3, 0, 0)})
+    empty = bpy.data.objects.new('Empty', None)
+    context.scene.collection.objects.link(empty)
+    empty.parent = context.scene.objects['Suzanne.001']
+    context.view_layer.update()
+    expected = {obj.name: obj.matrix_world.copy() for obj in context.scene.objects}
+    vertex = suzanne.data.vertices[0].co.copy()
+
+    ops.object.select_all(action='DESELECT')
+    suzanne.select_set(True)
+    context.view_layer.objects.active = suzanne
+    context.scene.cursor.location = (1, 2, 3)
+    ops.object.origin_set_with_instances(type='ORIGIN_CURSOR')
+
+    assert test_math_isclose((suzanne.data.vertices[0].co - vertex).length, 0)
+    for name, matrix in expected.items():
+        assert np.allclose(context.scene.objects[name].matrix_world, matrix, atol=1e-5)
+
+
+def test_separate_estimate_limits(context, ops):
+    from separate_with_instances.planning import bound_separation, estimate_separation
+
+    # clear scene
+    ops.wm.read_homefile()
+    ops.object.select_all(action='SELECT')
+    ops.object.delete(use_global=False, confirm=False)
+
+    ops.mesh.primitive_monkey_add()
+    suzanne = context.object
+    for _ in range(2):
+        ops.object.duplicate_move_linked(OBJECT_OT_duplicate={"linked": True, "mode": 'TRANSLATION'},
+                                         TRANSFORM_OT_translate={"value": (3, 0, 0)})
+    context.view_layer.objects.active = suzanne
+    instances = [obj for obj in context.scene.objects if obj != suzanne]
+
+    # two eyes, copied to two other instances
+    estimate = estimate_separation([(suzanne.data, instances)], 'LOOSE', 'OBJECTS')
+    assert (estimate.pieces, estimate.new_objects) == (2, 6)
+    estimate = estimate_separation([(suzanne.data, instances)], 'LOOSE', 'COLLECTION_INSTANCES')
+    assert (estimate.new_objects, estimate.removed_objects) == (5, 2)
+
+    # the cheap bound from element counts is never below the estimate
+    for separate_type in ('SELECTED', 'MATERIAL', 'LOOSE', 'CHUNKS'):
+        estimate = estimate_separation([(suzanne.data, instances)], separate_type, 'OBJECTS', faces_per_chunk=50)
+        bound = bound_separation([(suzanne.data, instances)], separate_type, 'OBJECTS', faces_per_chunk=50)
+        assert bound.new_objects >= estimate.new_objects and bound.memory_bytes >= estimate.memory_bytes
+
+    ops.object.editmode_toggle()
+    ops.mesh.select_all(action='SELECT')
+    assert ops.mesh.separate_with_instances(type='LOOSE', dry_run=True) == {'CANCELLED'}
+    assert len(context.scene.objects) == 3
+    assert context.object.mode == 'EDIT'
+
+    preferences = context.preferences.addons['separate_with_instances'].preferences
+    preferences.max_new_objects = 5
+    try:
+        with pytest.raises(RuntimeError):
+            ops.mesh.separate_with_instances(type='LOOSE')
+        assert len(context.scene.objects) == 3
+
+        ops.mesh.separate_with_instances(type='LOOSE', confirmed=True)
+    finally:
+        preferences.property_unset('max_new_objects')
+    assert len(context.scene.objects) == 9
+
+
+def test_instance_cache(context, ops):
+    from separate_with_instances.instance_cache import check_cache, mesh_user_cache
+
+    # clear scene
+    ops.wm.read_homefile()
+    ops.object.select_all(action='SELECT')
+    ops.object.delete(use_global=False, confirm=False)
+
+    ops.mesh.primitive_monkey_add()
+    suzanne = context.object
+    index = mesh_user_cache.instance_index(context.scene, [suzanne.data])
+    assert index[suzanne.data] == [suzanne]
+
+    # kept current by depsgraph updates, without a rebuild
+    ops.object.duplicate_move_linked(OBJECT_OT_duplicate={"linked": True, "mode": 'TRANSLATION'},
+                                     TRANSFORM_OT_translate={"value": (3, 0, 0)})
+    context.view_layer.update()
+    assert mesh_user_cache.scene_uid == context.scene.session_uid
+    assert len(mesh_user_cache.instance_index(context.scene, [suzanne.data])[suzanne.data]) == 2
+
+    context.object.data = bpy.data.meshes.new('other')
+    context.view_layer.update()
+    assert mesh_user_cache.instance_index(context.scene, [suzanne.data])[suzanne.data] == [suzanne]
+
+    # removed objects are dropped
+    ops.object.duplicate_move_linked(OBJECT_OT_duplicate={"linked": True, "mode": 'TRANSLATION'},
+                                     TRANSFORM_OT_translate={"value": (3, 0, 0)})
+    ops.object.delete(use_global=False, confirm=False)
+    assert mesh_user_cache.instance_index(context.scene, [suzanne.data])[suzanne.data] == [suzanne]
+
+    # objects unlinked from the scene stay in the file, but are dropped too
+    copy = bpy.data.objects.new('Copy', suzanne.data)
+    context.scene.collection.objects.link(copy)
+    context.view_layer.update()
+    assert len(mesh_user_cache.instance_index(context.scene, [suzanne.data])[suzanne.data]) == 2
+    context.scene.collection.objects.unlink(copy)
+    context.view_layer.update()
+    assert mesh_user_cache.instance_index(context.scene, [suzanne.data])[suzanne.data] == [suzanne]
+
+    assert check_cache(context.scene) == []
+    assert ops.object.check_instance_cache() == {'FINISHED'}
+
+
+def test_batch_process_file(context, ops, tmp_path):
+    from separate_with_instances.batch import collect_files, process_file
+
+    # clear scene
+    ops.wm.read_homefile()
+    ops.object.select_all(action='SELECT')
+    ops.object.delete(use_global=False, confirm=False)
+
+    ops.mesh.primitive_monkey_add()
+    context.object.data.materials.append(bpy.data.materials.new(name='test_material_a'))
+    context.object.data.materials.append(bpy.data.materials.new(name='test_material_b'))
+    for polygon in context.object.data.polygons:
+        polygon.material_index = polygon.index % 2
+    ops.object.duplicate_move_linked(OBJECT_OT_duplicate={"linked": True, "mode": 'TRANSLATION'},
+                                     TRANSFORM_OT_translate={"value": (3, 0, 0)})
+
+    (tmp_path / 'assets').mkdir()
+    ops.wm.save_as_mainfile(filepath=str(tmp_path / 'assets' / 'suzanne.blend'), copy=True)
+    (filepath, relative_path), = collect_files([tmp_path / 'assets'])
+
+    result = process_file(filepath, 'separate', {'type': 'MATERIAL', 'backend': 'OPERATOR'},
+                          tmp_path / 'out' / relative_path)
+    assert result['status'] == 'ok'
+    assert (result['objects_before'], result['objects_after']) == (2, 4)
+    assert (tmp_path / 'out' / 'suzanne.blend').exists()
+
+    result = process_file(filepath, 'origin', {'origin_type': 'ORIGIN_GEOMETRY', 'center': 'BOUNDS'})
+    assert result['status'] == 'ok'
+
+    assert process_file(tmp_path / 'missing.blend', 'origin', {})['status'] == 'error'
+
+
+@pytest.mark.parametrize('object_count', [10_000, 100_000])
+def test_instance_index_timing(context, ops, object_count):
+    from separate_with_instances.instance_index import build_instance_index, other_instances
+
+    # clear scene
+    ops.object.select_all(action='SELECT')
+    ops.object.delete(use_global=False, confirm=False)
+
+    meshes = [bpy.data.meshes.new('IndexMesh') for _ in range(100)]
+    collection_objects = context.scene.collection.objects
+    for i in range(object_count):
+        collection_objects.link(bpy.data.objects.new('IndexObject', meshes[i % len(meshes)]))
+
+    start = time.perf_counter()
+    index = build_instance_index(context.scene.objects)
+    elapsed = time.perf_counter() - start
+
+    assert len(index) == len(meshes)
+    assert all(len(index[mesh]) == object_count // len(meshes) for mesh in meshes)
+
+    obj = index[meshes[0]][0]
+    assert len(other_instances(index, obj)) == object_count // len(meshes) - 1
+
+    # a single pass, not one scan per selected object
+    assert elapsed < object_count * 1e-4
+
+
 # UTILITY TESTS/FUNCTIONS
 
 
@@ -0,0 +1,73 @@
+import numpy as np
+from mathutils import Matrix
+
+IDENTITY = np.identity(4)
+
+
+def gather_matrices(objects, attribute: str = 'matrix_world') -> np.ndarray:
+    """Reads one matrix attribute of every object into an (N, 4, 4) array."""
+    if not objects:
+        return np.empty((0, 4, 4))
+    return np.array([getattr(obj, attribute) for obj in objects], dtype=np.float64)
+
+
+def parent_spaces(objects, new_worlds: dict = None) -> np.ndarray:
+    """Gets the space each object's basis matrix is relative to, as an (N, 4, 4) array.
+
+    That is the parent's world matrix times the parent inverse matrix,
+    or identity for objects without a parent.
+
+    :param objects: objects to get parent spaces for
+    :param new_worlds: world matrices to use instead of the current ones for some parents,
+        for parents that are moved in the same batch
+    """
+    new_worlds = new_worlds or {}
+    spaces = np.empty((len(objects), 4, 4))
+    for i, obj in enumerate(objects):
+        parent = obj.parent
+        if parent is None:
+            spaces[i] = IDENTITY
+        elif obj.parent_type == 'OBJECT':
+            parent_world = new_worlds.get(parent)
+            if parent_world is None:
+                parent_world = np.array(parent.matrix_world)
+            spaces[i] = parent_world @ np.array(obj.matrix_parent_inverse)
+        else:
+            # bone and vertex parents: recover the space from the current transform
+            spaces[i] = np.array(obj.matrix_world) @ np.linalg.pinv(np.array(obj.matrix_basis))
+    return spaces
+
+
+def bases_from_worlds(spaces: np.ndarray, worlds: np.ndarray) -> np.ndarray:
+    """Computes the basis matrices that place objects at ``worlds``, given their parent spaces.
+
+    Both arrays broadcast, so one space can be shared by many world matrices.
+    """
+    try:
+        return np.linalg.solve(spaces, worlds)
+    except np.linalg.LinAlgError:
+        # zero scale somewhere in a parent chain
+        return np.linalg.pinv(spaces) @ worlds
+
+
+def write_bases(objects, bases: np.ndarray):
+    """Writes basis matrices back to objects.
+
+    Nothing is evaluated here, so callers update the view layer once afterwards.
+    """
+    for obj, basis in zip(objects, bases):
+        obj.matrix_basis = Matrix(basis.tolist())
+
+
+def set_world_matrices(objects, worlds: np.ndarray, new_worlds: dict = None):
+    """Moves objects to the given world matrices in one batch.
+
+    Parents that are also in ``objects`` are taken at their new world matrix,
+    so parent and child instances can be moved together.
+
+    :param new_worlds: new world matrix of every object moved in this operation,
+        when it is split across several batches; defaults to ``objects`` and ``worlds``
+    """
+    if new_worlds is None:
+        new_worlds = dict(zip(objects, worlds))
+    write_bases(objects, bases_from_worlds(parent_spaces(objects, new_worlds), worlds))